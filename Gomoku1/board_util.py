@@ -21,6 +21,11 @@ Encoding of special pass move
 """
 PASS = None
 
+"""
+Encoding of "not a real point", used as a marker
+"""
+NULLPOINT = 0
+
 """
 The largest board we allow. 
 To support larger boards the coordinate printing needs to be changed.
@@ -211,7 +211,7 @@ class GtpConnection():
             return
         gtp_moves = []
         for p in self.board.get_empty_points():
-            gtp_moves.append(format_point(point_to_coord(p, self.board.size)))
+            gtp_moves.append(self.board.geometry.point_names[p])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
 
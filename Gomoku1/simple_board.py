@@ -12,6 +12,7 @@ The board uses a 1-dimensional representation with padding
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, MAXSIZE
+from geometry import board_geometry
 
 class SimpleGoBoard(object):
 
@@ -61,8 +62,8 @@ class SimpleGoBoard(object):
         self.ko_recapture = None
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
-        self._initialize_empty_points(self.board) 
+        self.geometry = board_geometry(size)
+        self.board = self.geometry.empty_board.copy()
 
     def copy(self):
         b = SimpleGoBoard(self.size)
@@ -79,17 +80,6 @@ class SimpleGoBoard(object):
         assert row <= self.size
         return row * self.NS + 1
         
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -213,14 +203,11 @@ class SimpleGoBoard(object):
         
     def _neighbors(self, point):
         """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        return self.geometry.all_neighbors[point]
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
 
     """
     ======================================================================
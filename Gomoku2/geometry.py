@@ -0,0 +1,152 @@
+"""
+geometry.py
+
+Tables which only depend on the board size, see BoardGeometry.
+They are computed once per size by board_geometry and shared
+by all boards of that size, so creating a board does not rebuild them.
+"""
+
+import numpy as np
+from board_util import EMPTY, BORDER, NULLPOINT, MAXSIZE
+
+COLUMN_LETTERS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+
+class PointLists(object):
+    """
+    Lists of points in two compact int32 arrays: list i is
+    points[start[i] : start[i + 1]]. Indexing returns the list as a
+    plain Python list, which the board loops iterate much faster than a
+    numpy view. The lists are shared, so they must not be modified.
+    """
+
+    def __init__(self, lists):
+        self.start = np.zeros(len(lists) + 1, dtype = np.int32)
+        self.start[1:] = np.cumsum([len(points) for points in lists])
+        self.points = np.zeros(self.start[-1], dtype = np.int32)
+        for i, points in enumerate(lists):
+            self.points[self.start[i] : self.start[i + 1]] = points
+        self.start.flags.writeable = False
+        self.points.flags.writeable = False
+        self._lists = [self.points[self.start[i] : self.start[i + 1]].tolist()
+                       for i in range(len(lists))]
+
+    def __len__(self):
+        return len(self.start) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._lists[i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class BoardGeometry(object):
+    """
+    Precomputed tables of one board size, in the padded 1-dimensional
+    point representation, see GoBoardUtil.coord_to_point.
+    The tables are shared, so they must not be modified.
+
+    empty_board : numpy array, the empty board, BORDER around EMPTY
+    points : numpy array, the points on the board
+    neighbors : PointLists, the on-board neighbors of each point
+    all_neighbors, diag_neighbors : numpy arrays, maxpoint x 4,
+        the four neighbors and the four diagonal neighbors of each point,
+        including BORDER points
+    neighbors8 : PointLists, the on-board neighbors of each point in all
+        8 directions
+    lines : list of 4 PointLists, the points of every line of the board
+        in the directions horizontal, vertical, y=x and y=-x
+    point_names : list, the GTP coordinate string of each point,
+        such as 'A1', '' for BORDER points
+    """
+
+    def __init__(self, size):
+        assert 2 <= size <= MAXSIZE
+        self.size = size
+        self.NS = size + 1
+        self.maxpoint = size * size + 3 * (size + 1)
+        NS = self.NS
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        for row in range(1, size + 1):
+            start = row * NS + 1
+            board[start : start + size] = EMPTY
+        board.flags.writeable = False
+        self.empty_board = board
+        self.points = np.where(board == EMPTY)[0].astype(np.int32)
+        self.points.flags.writeable = False
+        # the border rows make point +- (NS + 1) of a board point
+        # a valid index, other points get NULLPOINT, which is a BORDER
+        # point, for off-array neighbors, see _clip
+        all_neighbors = np.zeros((self.maxpoint, 4), dtype = np.int32)
+        diag_neighbors = np.zeros((self.maxpoint, 4), dtype = np.int32)
+        for point in range(self.maxpoint):
+            nbs = [point - 1, point + 1, point - NS, point + NS]
+            diags = [point - NS - 1, point - NS + 1,
+                     point + NS - 1, point + NS + 1]
+            all_neighbors[point] = [self._clip(p) for p in nbs]
+            diag_neighbors[point] = [self._clip(p) for p in diags]
+        all_neighbors.flags.writeable = False
+        diag_neighbors.flags.writeable = False
+        self.all_neighbors = all_neighbors
+        self.diag_neighbors = diag_neighbors
+        neighbors = []
+        neighbors8 = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                neighbors.append([])
+                neighbors8.append([])
+                continue
+            neighbors.append([nb for nb in all_neighbors[point].tolist()
+                              if board[nb] != BORDER])
+            around = all_neighbors[point].tolist() + \
+                     diag_neighbors[point].tolist()
+            neighbors8.append([nb for nb in around if board[nb] != BORDER])
+        self.neighbors = PointLists(neighbors)
+        self.neighbors8 = PointLists(neighbors8)
+        self.lines = [PointLists(self._lines(shift))
+                      for shift in [1, NS, NS + 1, NS - 1]]
+        self.point_names = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                self.point_names.append('')
+            else:
+                row, col = divmod(point, NS)
+                self.point_names.append(COLUMN_LETTERS[col - 1] + str(row))
+
+    def _clip(self, point):
+        return point if 0 <= point < self.maxpoint else NULLPOINT
+
+    def _lines(self, shift):
+        """
+        The lines in direction shift. A line starts at a point whose
+        predecessor is off the board and runs to the last point on it.
+        """
+        lines = []
+        for start in self.points.tolist():
+            before = start - shift
+            if 0 <= before < self.maxpoint and \
+               self.empty_board[before] != BORDER:
+                continue
+            line = []
+            point = start
+            while 0 <= point < self.maxpoint and \
+                  self.empty_board[point] != BORDER:
+                line.append(point)
+                point += shift
+            lines.append(line)
+        return lines
+
+"""
+The geometry of each board size, see board_geometry
+"""
+_geometries = {}
+
+def board_geometry(size):
+    """
+    The shared BoardGeometry of a board size, created on first use.
+    """
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
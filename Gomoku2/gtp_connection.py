@@ -217,8 +217,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
 
@@ -364,8 +363,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves_gomoku(self.board)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
     
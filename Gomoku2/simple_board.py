@@ -14,6 +14,32 @@ import random
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
                        MAXSIZE, NULLPOINT
+from geometry import board_geometry
+
+"""
+Seed of the Zobrist key table, see zobrist_keys
+"""
+ZOBRIST_SEED = 496
+
+"""
+Zobrist keys of each board size, see zobrist_keys
+"""
+_zobrist_keys = {}
+
+def zobrist_keys(size):
+    """
+    Random 64-bit Zobrist keys of a board size, one per point and color,
+    computed once per size. EMPTY points do not change the code,
+    so their keys are 0. The generator is seeded so codes are the same
+    in every run.
+    """
+    if size not in _zobrist_keys:
+        rng = random.Random(ZOBRIST_SEED)
+        keys = []
+        for point in range(board_geometry(size).maxpoint):
+            keys.append([0, rng.getrandbits(64), rng.getrandbits(64)])
+        _zobrist_keys[size] = keys
+    return _zobrist_keys[size]
 
 class SimpleGoBoard(object):
 
@@ -83,13 +109,14 @@ class SimpleGoBoard(object):
         self.ko_recapture = None
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.geometry = board_geometry(size)
+        self.board = self.geometry.empty_board.copy()
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self.neighbors = self.geometry.neighbors
         # add for trace moves
         self.moves = []
         self.hash_code = self.generate_code()
+        self.position_code = 0
         self.draw_player = EMPTY
 
     def copy(self):
@@ -103,12 +130,15 @@ class SimpleGoBoard(object):
         # add for trace moves
         # already correct for the list pointer error
         b.moves = list(self.moves)
-        b.hash_code = np.copy(self.hash_code)
+        # the key table never changes, so it is shared
+        b.hash_code = self.hash_code
+        b.position_code = self.position_code
         b.draw_player = self.draw_player
         return b
 
     def undo_move(self):
         location = self.moves.pop()
+        self.position_code ^= self.hash_code[location][self.board[location]]
         self.board[location] = EMPTY
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
@@ -118,36 +148,6 @@ class SimpleGoBoard(object):
         assert row <= self.size
         return row * self.NS + 1
         
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
-        """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
-        """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
-        
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -320,14 +320,11 @@ class SimpleGoBoard(object):
         
     def _neighbors(self, point):
         """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        return self.geometry.all_neighbors[point]
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
     
     def _point_to_coord(self, point):
         """
@@ -367,6 +364,7 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self.position_code ^= self.hash_code[point][color]
         # add for trace moves
         self.moves.append(point)
         self.current_player = GoBoardUtil.opponent(color)
@@ -446,6 +444,7 @@ class SimpleGoBoard(object):
     def play_move_gomoku_auto_change_player(self, point):
         assert point != PASS
         self.board[point] = self.current_player
+        self.position_code ^= self.hash_code[point][self.current_player]
         self.moves.append(point)
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
@@ -463,22 +462,18 @@ class SimpleGoBoard(object):
             return 0
 
     def code(self):
-        hash_code = 0
-        for i in range(0, len(self.board)):
-            if self.board[i] != BORDER:
-                hash_code ^= int(self.hash_code[i][self.board[i]])
-
-        return hash_code
+        """
+        Zobrist code of the position, kept up to date by
+        play_move_gomoku, play_move_gomoku_auto_change_player and undo_move.
+        """
+        return self.position_code
 
     def generate_code(self):
-        code = np.zeros((len(self.board), 3))
-        index = 0
-        for i in range(0, len(self.board)):
-            for color in range(3):
-                code[i][color] = index
-                index += 1
-        # print(code)
-        return code
+        """
+        The Zobrist keys of the board size, shared by all boards
+        of that size, see zobrist_keys
+        """
+        return zobrist_keys(self.size)
 
     def set_draw_winner(self, color):
         self.draw_player = color
@@ -20,12 +20,10 @@ class solver():
         return result, move
 
     def alphabeta(self, state, alpha, beta, depth, proof_tree_depth_zero):
-        # result = self.table.lookup(state.code(), depth)
-        # # check on table
-        # if result != None:
-        #     # print(str(GoBoardUtil.get_twoD_board(state)))
-        #     # print("get " + str(result))
-        #     return result
+        # check on table, it holds the exact values of evaluated leaves
+        result = self.table.lookup(state.code(), depth, 0)
+        if result != None:
+            return result
             
         if depth == 0 or state.end_of_game():    
             result = state.staticallyEvaluateForToPlay()
@@ -215,8 +215,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
 
@@ -307,8 +306,7 @@ class GtpConnection():
             
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(_type + " " + sorted_moves)
 
@@ -341,8 +339,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves_gomoku(self.board)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
     
@@ -370,8 +367,7 @@ class GtpConnection():
     
     def gogui_rules_final_result_cmd(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
-        moves = self.board.get_empty_points()
-        board_full = (len(moves) == 0)
+        board_full = (self.board.num_empty_points() == 0)
         if board_full and not game_end:
             self.respond("draw")
             return
@@ -0,0 +1,138 @@
+"""
+patterns.py
+
+Compiles gomoku line patterns into lookup tables over encoded
+line windows, so matching a set of patterns is a few table lookups.
+
+A line window holds the cells within WINDOW_RADIUS of a point along
+one of the 4 line directions, encoded in base 4. The cell at offset k
+from the point uses the 2 bits at 2 * (k + WINDOW_RADIUS).
+The longest pattern has 7 cells, so the window of a move holds every
+cell a pattern through the move can look at.
+
+A pattern is a string of cells along a line, together with the index
+of the move in it, as in {'-.ooo-' : 1}. A pattern matches in both
+orientations of the line. The cells are read by an alphabet, which maps
+each pattern character to the cells it accepts:
+'o' the color to play, 'x' the opponent, '-' EMPTY, '#' BORDER.
+By convention '.' marks empty points of interest, such as the move
+itself, and is read as EMPTY.
+"""
+
+import itertools
+import numpy as np
+from board_util import GoBoardUtil, EMPTY, BORDER
+
+WINDOW_RADIUS = 6
+CENTER_MASK = 3 << (2 * WINDOW_RADIUS)
+
+def line_window_codes(board, NS):
+    """
+    Line window codes of all points of a padded board array.
+    Cells outside the array are BORDER.
+    Returns
+    -------
+    numpy array, the code of point in direction d (horizontal,
+    vertical, y=x and y=-x) is at flat position d * len(board) + point
+    """
+    maxpoint = len(board)
+    points = np.arange(maxpoint)
+    codes = np.zeros(4 * maxpoint, dtype = np.int64)
+    for d, shift in enumerate([1, NS, NS + 1, NS - 1]):
+        for k in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+            cells = points + k * shift
+            inside = (cells >= 0) & (cells < maxpoint)
+            colors = np.full(maxpoint, BORDER, dtype = np.int64)
+            colors[inside] = board[cells[inside]]
+            codes[d * maxpoint : (d + 1) * maxpoint] += \
+                colors << (2 * (k + WINDOW_RADIUS))
+    return codes
+
+def compile_patterns(patterns, color, alphabet, mirror = True):
+    """
+    Compile patterns for color to play into lookup tables.
+    patterns maps a pattern to the index of the move in it.
+    With mirror, each pattern also matches the reversed line.
+    Returns
+    -------
+    A list of (bits, mask, table). A window code c, with the cell of the
+    move cleared, matches iff (c >> bits) & mask is a key of one table.
+    The value is the tuple of offsets of the other '.' cells,
+    for the first listed pattern that matches the code.
+    """
+    opponent = GoBoardUtil.opponent(color)
+    kinds = {'o': color, 'x': opponent, '-': EMPTY, '#': BORDER}
+    forms = []
+    for pattern, start_index in patterns.items():
+        forms.append((pattern, start_index, 1))
+        if mirror:
+            forms.append((pattern, start_index, -1))
+    tables = {}
+    order = []
+    for pattern, start_index, sign in forms:
+        offsets = [(i - start_index) * sign for i in range(len(pattern))]
+        low = min(offsets)
+        span = (2 * (low + WINDOW_RADIUS), (1 << (2 * len(pattern))) - 1)
+        if span not in tables:
+            tables[span] = {}
+            order.append(span)
+        table = tables[span]
+        marks = tuple(k for k, c in zip(offsets, pattern)
+                      if c == '.' and k != 0)
+        choices = []
+        for k, c in zip(offsets, pattern):
+            if k == 0:
+                choices.append([EMPTY])
+            else:
+                choices.append([kinds[kind] for kind in alphabet[c]])
+        for cells in itertools.product(*choices):
+            code = 0
+            for k, cell in zip(offsets, cells):
+                code |= cell << (2 * (k - low))
+            if code not in table:
+                table[code] = marks
+    return [(bits, mask, tables[(bits, mask)]) for bits, mask in order]
+
+"""
+The keys of each compiled table as a sorted numpy array, see
+match_codes_array. Entries hold on to their table, so ids are not reused.
+"""
+_table_keys = {}
+
+def _sorted_keys(table):
+    entry = _table_keys.get(id(table))
+    if entry is None:
+        entry = (table, np.array(sorted(table), dtype = np.int64))
+        _table_keys[id(table)] = entry
+    return entry[1]
+
+def match_codes(compiled, codes):
+    """
+    Match compiled patterns against the window codes of a move,
+    one code per direction, with the cell of the move cleared.
+    Returns
+    -------
+    (direction, marks) of the first match, or None
+    """
+    for bits, mask, table in compiled:
+        for direction, code in enumerate(codes):
+            marks = table.get((code >> bits) & mask)
+            if marks is not None:
+                return direction, marks
+    return None
+
+def match_codes_array(compiled, codes):
+    """
+    match_codes for many moves at once. codes is a numpy array of
+    4 x moves window codes, with the cells of the moves cleared.
+    Returns
+    -------
+    boolean numpy array, whether some pattern matches each move
+    """
+    found = np.zeros(codes.shape[1], dtype = np.bool_)
+    for bits, mask, table in compiled:
+        keys = _sorted_keys(table)
+        fields = (codes >> bits) & mask
+        index = np.minimum(np.searchsorted(keys, fields), len(keys) - 1)
+        found |= (keys[index] == fields).any(axis = 0)
+    return found
@@ -1,10 +1,34 @@
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, where1d
+from patterns import CENTER_MASK, line_window_codes, compile_patterns, \
+                     match_codes
+
+"""
+Alphabet of the rule patterns, see patterns.py.
+'?' is an opponent stone or BORDER.
+"""
+RULES_ALPHABET = {'o': 'o', 'x': 'x', '-': '-', '?': 'x#', '.': '-'}
+
+WIN_IN_2_PATTERNS = {'-ooo.-' : 4, '-o.oo-' : 2, '-.ooo-' : 1, '-oo.o-' : 3}
+BLOCK_OPEN_FOUR_PATTERNS = {'.x.xx.' : 0, '.xx.x.' : 0, '?.xxx..' : 1,
+                            '..xxx.?' : 0, '-.xxx.-': 1}
+
+"""
+The rule patterns compiled once for each color to play
+"""
+WIN_IN_2_TABLES = {}
+BLOCK_OPEN_FOUR_TABLES = {}
+for color in [BLACK, WHITE]:
+    WIN_IN_2_TABLES[color] = compile_patterns(WIN_IN_2_PATTERNS, color,
+                                              RULES_ALPHABET)
+    BLOCK_OPEN_FOUR_TABLES[color] = compile_patterns(BLOCK_OPEN_FOUR_PATTERNS,
+                                                     color, RULES_ALPHABET)
 
 class rules:
     def __init__(self, player, board, NS):
         self.player = player
         self.board = board
         self.NS = NS
+        self.line_codes = None
 
     def policy_type_search_move(self):
         # Should figure out the order!!!
@@ -81,64 +105,28 @@ class rules:
     
 
     def win_in_2_move(self, color):
-        EMPTY_POINT = where1d(self.board == EMPTY)
-        patterns = {'-ooo.-' : 4, '-o.oo-' : 2, '-.ooo-' : 1, '-oo.o-' : 3}
-        for point in EMPTY_POINT:
-            for pattern in patterns.keys():
-                for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                    isFound, result = self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                    if isFound:
-                        return result
-        return []
+        return self.match_patterns(WIN_IN_2_TABLES[color])
 
     def block_open_four(self, color):
-        EMPTY_POINT = where1d(self.board == EMPTY)
-        patterns = {'.x.xx.' : 0, '.xx.x.' : 0, '?.xxx..' : 1, '..xxx.?' : 0, '-.xxx.-': 1}
-        for point in EMPTY_POINT:
-            for pattern in patterns.keys():
-                for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                    isFound, result = self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                    if isFound:
-                        return result
-        return []
+        return self.match_patterns(BLOCK_OPEN_FOUR_TABLES[color])
 
-    def check_pattern(self, pattern, start_point, color, shift, start_index):
-        opponent = GoBoardUtil.opponent(color)
-        front = start_index
-        d = shift
-        p = start_point
-        result = []
-        for i in range(front):
-            p -= d
-            if pattern[i] == "x" and self.board[p] == opponent:
-                continue
-            elif pattern[i] == "o" and self.board[p] == color:
-                continue
-            elif pattern[i] == "." and self.board[p] == EMPTY:
-                result.append(p)
-                continue
-            elif pattern[i] == "-" and self.board[p] == EMPTY:
-                continue
-            elif pattern[i] == "?" and self.board[p] != color and self.board[p] != EMPTY:
-                continue  
-            else:
-                return False, None
-        p = start_point
-        for i in range(start_index + 1, len(pattern)):
-            p += d
-            if pattern[i] == "x" and self.board[p] == opponent:
-                continue
-            elif pattern[i] == "o" and self.board[p] == color:
-                continue
-            elif pattern[i] == "." and self.board[p] == EMPTY:
-                result.append(p)
-                continue
-            elif pattern[i] == "-" and self.board[p] == EMPTY:
-                continue
-            elif pattern[i] == "?" and self.board[p] != color and self.board[p] != EMPTY:
-                continue
-            else:
-                return False, None
-        result.append(start_point)    
-
-        return True, result
\ No newline at end of file
+    def match_patterns(self, compiled):
+        """
+        Find the first empty point where one of the compiled patterns
+        matches. Returns the '.' points of the pattern, ending
+        with the matched point, or [] if no pattern matches.
+        """
+        if self.line_codes is None:
+            self.line_codes = line_window_codes(self.board, self.NS)
+        maxpoint = len(self.board)
+        shifts = [1, self.NS, self.NS + 1, self.NS - 1]
+        for point in where1d(self.board == EMPTY):
+            codes = self.line_codes[point::maxpoint].tolist()
+            codes = [code & ~CENTER_MASK for code in codes]
+            found = match_codes(compiled, codes)
+            if found is not None:
+                direction, marks = found
+                result = [point + k * shifts[direction] for k in marks]
+                result.append(point)
+                return result
+        return []
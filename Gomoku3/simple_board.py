@@ -14,6 +14,7 @@ import random
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
                        MAXSIZE, NULLPOINT
+from geometry import board_geometry
 from rules import rules
 
 class SimpleGoBoard(object):
@@ -61,9 +62,18 @@ class SimpleGoBoard(object):
     def get_empty_points(self):
         """
         Return:
-            The empty points on the board
+            The empty points on the board, in increasing order
+            like the board scan they replace, since callers such as
+            genmove break ties between moves by this order
         """
-        return where1d(self.board == EMPTY)
+        return np.sort(self.empty_points[:self.num_empty])
+
+    def num_empty_points(self):
+        """
+        Return:
+            The number of empty points on the board
+        """
+        return self.num_empty
 
     def __init__(self, size):
         """
@@ -84,10 +94,14 @@ class SimpleGoBoard(object):
         self.ko_recapture = None
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.geometry = board_geometry(size)
+        self.board = self.geometry.empty_board.copy()
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self._initialize_empty_index()
+        self.neighbors = self.geometry.neighbors
+        # winner is set by the move that makes five in a row
+        self.winner = None
+        self.winning_move = None
         self.moves = []
 
     def copy(self):
@@ -98,11 +112,20 @@ class SimpleGoBoard(object):
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        b.empty_points = np.copy(self.empty_points)
+        b.empty_index = np.copy(self.empty_index)
+        b.num_empty = self.num_empty
+        b.winner = self.winner
+        b.winning_move = self.winning_move
         return b
 
     def undo_move(self):
         location = self.moves.pop()
         self.board[location] = EMPTY
+        self._add_empty(location)
+        if location == self.winning_move:
+            self.winner = None
+            self.winning_move = None
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
     def row_start(self, row):
@@ -110,36 +133,34 @@ class SimpleGoBoard(object):
         assert row <= self.size
         return row * self.NS + 1
         
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
-        """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
-        """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
-        
+    def _initialize_empty_index(self):
+        """
+        Build the index of empty points.
+        empty_points[:num_empty] holds the empty points, and
+        empty_index[point] is the position of point in empty_points.
+        Both are kept in sync by _add_empty and _remove_empty,
+        so empty point queries never scan the board.
+        """
+        self.empty_points = where1d(self.board == EMPTY).astype(np.int32)
+        self.num_empty = len(self.empty_points)
+        self.empty_index = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        self.empty_index[self.empty_points] = np.arange(self.num_empty, 
+                                                        dtype = np.int32)
+
+    def _add_empty(self, point):
+        """ point became empty: append it to the empty point index """
+        self.empty_points[self.num_empty] = point
+        self.empty_index[point] = self.num_empty
+        self.num_empty += 1
+
+    def _remove_empty(self, point):
+        """ point became occupied: swap-remove it from the empty point index """
+        i = self.empty_index[point]
+        self.num_empty -= 1
+        last = self.empty_points[self.num_empty]
+        self.empty_points[i] = last
+        self.empty_index[last] = i
+
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -250,6 +271,8 @@ class SimpleGoBoard(object):
             return None
         captures = list(where1d(opp_block))
         self.board[captures] = EMPTY
+        for stone in captures:
+            self._add_empty(stone)
         self.liberty_of[captures] = NULLPOINT
         single_capture = None 
         if len(captures) == 1:
@@ -312,14 +335,11 @@ class SimpleGoBoard(object):
         
     def _neighbors(self, point):
         """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        return self.geometry.all_neighbors[point]
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
     
     def _point_to_coord(self, point):
         """
@@ -355,6 +375,11 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self._remove_empty(point)
+        # only the lines through the new stone can make a new five
+        if self.winner is None and self.point_check_game_end_gomoku(point):
+            self.winner = color
+            self.winning_move = point
         self.current_player = GoBoardUtil.opponent(color)
         self.moves.append(point)
         return True
@@ -373,7 +398,7 @@ class SimpleGoBoard(object):
             if self.board[p] == color:
                 count = count + 1
                 if count == 5:
-                    break
+                    return True
             else:
                 break
         d = -d
@@ -383,7 +408,7 @@ class SimpleGoBoard(object):
             if self.board[p] == color:
                 count = count + 1
                 if count == 5:
-                    break
+                    return True
             else:
                 break
         assert count <= 5
@@ -415,18 +440,13 @@ class SimpleGoBoard(object):
         """
             Check if the game ends for the game of Gomoku.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
+        return self.winner is not None, self.winner
 
-        return False, None
+    def is_terminal(self):
+        """
+            The game is over: someone made five in a row or the board is full.
+            """
+        return self.winner is not None or self.num_empty == 0
 
 
     #----------------------------------------------------------------------------
@@ -434,39 +454,42 @@ class SimpleGoBoard(object):
     #----------------------------------------------------------------------------
     def simulate(self):
         i = 0
-        isEnd, winner = self.check_game_end_gomoku()
-        if not isEnd:
+        if not self.is_terminal():
             allMoves = self.get_empty_points()
             random.shuffle(allMoves)
             for i in range(len(allMoves)):
                 thisMove = allMoves[i]
                 self.play_move_gomoku(thisMove, self.current_player)
-                isEnd, winner = self.check_game_end_gomoku()
-                if not isEnd:
+                if self.winner is None:
                     i += 1
-                    if len(self.get_empty_points()) == 0:
+                    if self.num_empty_points() == 0:
                         return EMPTY, i 
                 else:      
-                    return winner, i
-        else:
-            return winner, i
+                    return self.winner, i
+        return self.final_winner(), i
 
     def ruleBaseSimulation(self):
         i = 0
-        isEnd, winner = self.check_game_end_gomoku()
-        if not isEnd:
+        if not self.is_terminal():
             while True:
                 moveFound = self.getSingleMoveByPolicy()
                 self.play_move_gomoku(moveFound, self.current_player)      
-                isEnd, winner = self.check_game_end_gomoku()
-                if not isEnd:
+                if self.winner is None:
                     i += 1
-                    if len(self.get_empty_points()) == 0:
+                    if self.num_empty_points() == 0:
                         return EMPTY, i
                 else:
-                    return winner, i
-        else:
-            return winner, i
+                    return self.winner, i
+        return self.final_winner(), i
+
+    def final_winner(self):
+        """
+        Winner of a finished game, EMPTY for a draw.
+        """
+        assert self.is_terminal()
+        if self.winner is None:
+            return EMPTY
+        return self.winner
 
     def getPolicyMoveList(self):
         moveFound, _type = rules(self.current_player, self.board, self.NS).policy_type_search_move()
@@ -5,61 +5,157 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
 from simple_board import SimpleGoBoard
-from mcts import MCTS
+from mcts import MCTS, MAX_NODES, ROOT
 
+import sys
 import random
+import threading
 import numpy as np
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undo_move(move)
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
 def game_result(board):
-    game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
-    if game_end:
-        #return 1 if winner == board.current_player else -1
-        return winner
-    if board_full:
+    if not board.is_terminal():
+        return None
+    if board.winner is None:
         return 'draw'
-    return None
+    return board.winner
 
 class Gomoku4(object):
     """
-    For each move do `n_simualtions_per_move` playouts,
-    then select the one with best win-rate.
+    For each move do `n_simualtions_per_move` playouts, fewer if the
+    deadline given by gtp_connection comes first or once the most visited
+    move is decided, then select the most visited move.
+    With n_simualtions_per_move None, search until the deadline.
     playout could be either random or rule_based (i.e., uses pre-defined patterns) 
     """
-    def __init__(self, n_simualtions_per_move=1000, exploration=0.4):
+    def __init__(self, n_simualtions_per_move=1000, exploration=0.4,
+                 n_workers=1, batch_size=1, transpositions=False,
+                 max_nodes=MAX_NODES):
+        """
+        n_workers > 1 runs a root parallel search on that many processes
+        batch_size > 1 plays the rollouts in batches of that many games
+        transpositions shares the nodes of positions reached by different
+        move orders, see Tree
+        max_nodes is the node budget of the tree, beyond which the least
+        visited nodes are pruned, see Tree.prune
+        Pondering is off until the GTP command `ponder on` sets the ponder
+        attribute, then the search goes on while the opponent thinks, see
+        start_pondering
+        """
         self.n_simualtions_per_move=n_simualtions_per_move
         self.exploration = exploration
-        self.parent = None
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.transpositions = transpositions
+        self.max_nodes = max_nodes
+        self.snapshot = None
+        self.ponder = False
+        self._ponder_thread = None
+        self._stop_ponder = threading.Event()
 
         self.name="Gomoku4"
         self.version = 4.0
         self.best_move=None
 
-        self.MCTS = MCTS()
+        self.MCTS = MCTS(transpositions=self.transpositions,
+                         max_nodes=self.max_nodes)
 
-    def reset(self):
-        self.MCTS = MCTS()
+    def reset(self, board=None):
+        """
+        Start a new game on board, from the snapshot if it is of board's
+        position, see load_snapshot
+        """
+        self.stop_pondering()
+        self.MCTS = MCTS(transpositions=self.transpositions,
+                         max_nodes=self.max_nodes)
+        if board is not None:
+            self.warm_start(board)
+
+    def save_snapshot(self, board, filename, plies=None):
+        """
+        Save the first plies plies of the tree, all of it if plies is None,
+        to filename, see MCTS.save. board is the position of the game.
+        Returns the number of nodes saved.
+        """
+        self.stop_pondering()
+        return self.MCTS.save(filename, board, plies)
+
+    def load_snapshot(self, board, filename):
+        """
+        Load the tree of board's position from the snapshot filename, see
+        MCTS.load, and start each new game from it, see warm_start.
+        Raises ValueError or OSError if it cannot be loaded.
+        Returns the number of nodes loaded.
+        """
+        self.stop_pondering()
+        num_nodes = self.MCTS.load(filename, board)
+        self.snapshot = filename
+        return num_nodes
+
+    def warm_start(self, board):
+        """
+        Load the snapshot if the tree is empty and the snapshot is of
+        board's position, so the search starts from its visits.
+        """
+        if self.snapshot is None or self.MCTS.tree.visits[ROOT] > 0:
+            return
+        try:
+            num_nodes = self.MCTS.load(self.snapshot, board)
+        except (ValueError, OSError) as e:
+            sys.stderr.write("Snapshot not used: {} \n".format(e))
+        else:
+            sys.stderr.write("Snapshot loaded: {} nodes \n".format(num_nodes))
+        sys.stderr.flush()
+
+    def start_pondering(self, board):
+        """
+        If ponder is set, keep searching the tree from board, the position
+        after the engine's move, on a thread until stop_pondering.
+        """
+        if not self.ponder or board.is_terminal():
+            return
+        self._stop_ponder.clear()
+        self._ponder_thread = threading.Thread(
+            target=self.MCTS.ponder,
+            args=(board.copy(), self.exploration, self._stop_ponder,
+                  self.batch_size),
+            daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """
+        Stop the pondering thread and wait for its last playout.
+        Returns whether it was running.
+        """
+        if self._ponder_thread is None:
+            return False
+        self._stop_ponder.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        return True
 
     def get_random_move(self, board):
         return GoBoardUtil.generate_random_move_gomoku(board)
 
-    def update(self, move):
-        self.parent = self.MCTS._root 
-        self.MCTS.update_with_move(move)
+    def update(self, move, color=None):
+        """
+        Advance the tree past move, played by color, see MCTS.update_with_move
+        """
+        self.MCTS.update_with_move(move, color)
 
-    def get_move(self, board, color_to_play):
+    def get_move(self, board, color_to_play, deadline=None):
         """
         The genmove function called by gtp_connection
+        deadline is a time.monotonic() time by which to return the move
         """
-        move = self.MCTS.get_move(board, color_to_play, self.n_simualtions_per_move, self.exploration)
+        self.stop_pondering()
+        self.warm_start(board)
+        move = self.MCTS.get_move(board, color_to_play, self.n_simualtions_per_move, self.exploration, self.n_workers, self.batch_size, deadline)
         self.update(move)
         return move
 
@@ -1,19 +1,12 @@
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER
 #from profilehooks import profile
 
-def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
-
 def game_end(board):
-    game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
-    if game_end:
-        return 1 if winner == board.current_player else -1
-    if board_full:
+    if not board.is_terminal():
+        return None
+    if board.winner is None:
         return 0
-    return None
+    return 1 if board.winner == board.current_player else -1
 
 def alphabeta(board,alpha,beta):
     #print(GoBoardUtil.get_twoD_board(board),alpha,beta)
@@ -23,20 +16,20 @@ def alphabeta(board,alpha,beta):
     solvePoint=board.list_solve_point()
     if solvePoint:
         #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
+        board.make(solvePoint[0])
         result=-alphabeta(board,-beta,-alpha)
         if(result>alpha):
             alpha=result
-        undo(board,solvePoint[0])
+        board.unmake()
         if(result>=beta):
             return beta
     else:
         for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
+            board.make(m)
             result=-alphabeta(board,-beta,-alpha)
             if(result>alpha):
                 alpha=result
-            undo(board,m)
+            board.unmake()
             if(result>=beta):
                 return beta
     return alpha
@@ -55,20 +48,20 @@ def solve(board):
     solvePoint=board.list_solve_point()
     if solvePoint:
         #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
+        board.make(solvePoint[0])
         result=-alphabeta(board,-beta,-alpha)
-        undo(board,solvePoint[0])
+        board.unmake()
         if(result==1):
             return True,solvePoint[0]
         elif(result==0):
             haveDraw=True
     else: 
         for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
+            board.make(m)
             result=-alphabeta(board,-beta,-alpha)
             #print(GoBoardUtil.get_twoD_board(board))
             #print(result)
-            undo(board,m)
+            board.unmake()
             if(result==1):
                 return True,m
             elif(result==0):
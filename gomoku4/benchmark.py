@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+"""
+benchmark.py
+
+Microbenchmarks of the board operations used by the search.
+Usage: python3 benchmark.py [boardsize]
+"""
+
+import sys
+import random
+import timeit
+import tracemalloc
+import numpy as np
+from simple_board import SimpleGoBoard
+from mcts import Tree, ROOT
+
+def copy_by_reset(board):
+    """
+    Copy the way SimpleGoBoard.copy used to: build a new board,
+    then overwrite its mutable state.
+    """
+    b = SimpleGoBoard(board.size)
+    b.ko_recapture = board.ko_recapture
+    b.current_player = board.current_player
+    b.board = np.copy(board.board)
+    b.liberty_of = np.copy(board.liberty_of)
+    b.empty_points = np.copy(board.empty_points)
+    b.empty_index = np.copy(board.empty_index)
+    b.num_empty = board.num_empty
+    b.line_codes = np.copy(board.line_codes)
+    b.winner = board.winner
+    b.winning_move = board.winning_move
+    return b
+
+class DictTreeNode(object):
+    """
+    TreeNode the way it used to be: a __dict__ per node and
+    children keyed by numpy points.
+    """
+    version = 0.22
+    name = "MCTS Player"
+    def __init__(self, parent):
+        self._parent = parent
+        self._children = {}
+        self._n_visits = 0
+        self._black_wins = 0
+        self._expanded = False
+        self._move = None
+        self._has_knowledge = 0
+
+    def expand(self, board):
+        for move in board.get_empty_points():
+            self._children[move] = DictTreeNode(self)
+            self._children[move]._move = move
+            self._children[move]._has_knowledge = \
+                board.policy_type_search_move(move)
+        self._expanded = True
+
+def node_tree_two_plies(board):
+    """ Expand the root and each of its children, as an early search does """
+    root = DictTreeNode(None)
+    root.expand(board)
+    for move, child in root._children.items():
+        board.make(move)
+        child.expand(board)
+        board.unmake()
+    return root
+
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node._children.values())
+    return count
+
+def array_tree_two_plies(board):
+    """ The tree of node_tree_two_plies, as a Tree """
+    tree = Tree()
+    tree.expand(ROOT, board)
+    for edge in tree.edges(ROOT):
+        board.make(tree.move[edge])
+        tree.expand(tree.child_node(edge, board), board)
+        board.unmake()
+    return tree
+
+def allocated_bytes(function, *args):
+    """ Bytes allocated by function that are still held by its result """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+def middle_game_board(size, n_moves):
+    random.seed(496)
+    board = SimpleGoBoard(size)
+    for _ in range(n_moves):
+        move = random.choice(list(board.get_empty_points()))
+        board.play_move_gomoku(move, board.current_player)
+    return board
+
+def rate(function, number):
+    """ Calls of function per second, best of 3 runs """
+    best = min(timeit.repeat(function, number = number, repeat = 3))
+    return number / best
+
+def benchmark_copy(size):
+    board = middle_game_board(size, size * size // 4)
+    number = 2000
+    new = rate(board.copy, number)
+    old = rate(lambda: copy_by_reset(board), number)
+    print("board copy, size {}".format(size))
+    print("  copy():        {:10.0f} copies/s".format(new))
+    print("  copy by reset: {:10.0f} copies/s".format(old))
+    print("  speedup:       {:10.1f}x".format(new / old))
+
+def benchmark_tree_memory(size):
+    board = SimpleGoBoard(size)
+    new, tree = allocated_bytes(array_tree_two_plies, board)
+    old, root = allocated_bytes(node_tree_two_plies, board)
+    nodes = count_nodes(root)
+    # a TreeNode is created for every move, a Tree node only once the
+    # move is selected, but the Tree has an edge for every move
+    assert nodes == tree.edges_used + 1
+    print("tree memory, size {}, {} nodes".format(size, nodes))
+    print("  Tree:          {:10.0f} bytes/node, capacity {} nodes, {} edges"
+          .format(new / nodes, tree.capacity, tree.edge_capacity))
+    print("  node objects:  {:10.0f} bytes/node".format(old / nodes))
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    benchmark_copy(size)
+    benchmark_tree_memory(size)
+
+if __name__ == '__main__':
+    main()
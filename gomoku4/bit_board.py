@@ -0,0 +1,296 @@
+"""
+bit_board.py
+
+Implements a Gomoku board with the stones of each color stored as
+a Python int bitboard, with functions to:
+- initialize to a given board size
+- check if a move is legal
+- play and undo a move, also through a move stack
+- detect five in a row with shift-and-mask operations
+
+Bit i of a bitboard is the point i of the padded 1-dimensional
+representation used by SimpleGoBoard, see GoBoardUtil.coord_to_point.
+Column 0 of every row is a guard column which never holds a stone,
+so runs of stones cannot wrap from one row into the next.
+BitGoBoard implements the gomoku subset of the SimpleGoBoard API
+that mcts.py uses, so the search can run on it in its place.
+"""
+
+import numpy as np
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
+                       PASS, is_black_white, coord_to_point, MAXSIZE
+from simple_board import SimpleGoBoard, policy_values
+from patterns import WINDOW_RADIUS
+from geometry import board_geometry
+
+"""
+Five-in-a-row masks of each board size, see BitGoBoard._initialize_five_masks
+"""
+_five_masks = {}
+
+class BitGoBoard(object):
+
+    def __init__(self, size):
+        """
+        Creates a Gomoku bitboard of given size
+        """
+        assert 2 <= size <= MAXSIZE
+        self.reset(size)
+
+    def reset(self, size):
+        """
+        Creates a start state, an empty board with the given size
+        """
+        self.size = size
+        self.NS = size + 1
+        self.WE = 1
+        self.current_player = BLACK
+        self.maxpoint = size * size + 3 * (size + 1)
+        self.geometry = board_geometry(size)
+        self.on_board = 0
+        for point in self.geometry.points.tolist():
+            self.on_board |= 1 << point
+        self.stones = {BLACK: 0, WHITE: 0}
+        self.empty = self.on_board
+        self.num_empty = size * size
+        self.winner = None
+        self.winning_move = None
+        self.move_stack = np.zeros(size * size, dtype = np.int32)
+        self.num_moves = 0
+        self._initialize_five_masks()
+
+    def copy(self):
+        """
+        Python ints are immutable, so a copy only shares them.
+        """
+        b = BitGoBoard.__new__(BitGoBoard)
+        b.size = self.size
+        b.NS = self.NS
+        b.WE = self.WE
+        b.current_player = self.current_player
+        b.maxpoint = self.maxpoint
+        b.geometry = self.geometry
+        b.on_board = self.on_board
+        b.stones = dict(self.stones)
+        b.empty = self.empty
+        b.num_empty = self.num_empty
+        b.winner = self.winner
+        b.winning_move = self.winning_move
+        b.move_stack = self.move_stack.copy()
+        b.num_moves = self.num_moves
+        b.five_masks = self.five_masks
+        return b
+
+    def _initialize_five_masks(self):
+        """
+        For each point, store a mask per direction of the start bits
+        of all five-in-a-row windows through the point.
+        The masks are computed once per board size.
+        """
+        if self.size in _five_masks:
+            self.five_masks = _five_masks[self.size]
+            return
+        self.five_masks = []
+        _five_masks[self.size] = self.five_masks
+        for point in range(self.maxpoint):
+            masks = []
+            for shift in self._shifts():
+                mask = 0
+                for k in range(5):
+                    start = point - k * shift
+                    if start >= 0:
+                        mask |= 1 << start
+                masks.append(mask)
+            self.five_masks.append(masks)
+
+    def _shifts(self):
+        """ horizontal, vertical, y=x and y=-x """
+        return [1, self.NS, self.NS + 1, self.NS - 1]
+
+    def row_start(self, row):
+        assert row >= 1
+        assert row <= self.size
+        return row * self.NS + 1
+
+    def pt(self, row, col):
+        return coord_to_point(row, col, self.size)
+
+    def get_color(self, point):
+        bit = 1 << int(point)
+        if self.stones[BLACK] & bit:
+            return BLACK
+        elif self.stones[WHITE] & bit:
+            return WHITE
+        elif self.on_board & bit:
+            return EMPTY
+        return BORDER
+
+    @property
+    def board(self):
+        """
+        The position as a padded numpy array, see SimpleGoBoard.board.
+        This is built on every access, so it is meant for output only.
+        """
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        for point in self._points_of(self.on_board):
+            board[point] = EMPTY
+        for color in (BLACK, WHITE):
+            for point in self._points_of(self.stones[color]):
+                board[point] = color
+        return board
+
+    def _points_of(self, bits):
+        """ List of the points whose bits are set """
+        points = []
+        while bits:
+            low = bits & -bits
+            points.append(low.bit_length() - 1)
+            bits ^= low
+        return points
+
+    def get_empty_points(self):
+        """
+        Return:
+            The empty points on the board
+        """
+        return np.array(self._points_of(self.empty), dtype = np.int32)
+
+    def num_empty_points(self):
+        """
+        Return:
+            The number of empty points on the board
+        """
+        return self.num_empty
+
+    def code(self):
+        """
+        Exact key of the position and the player to move.
+        """
+        return ((self.stones[WHITE] << self.maxpoint | self.stones[BLACK])
+                << 2 | self.current_player)
+
+    def is_legal_gomoku(self, point, color):
+        """
+            Check whether it is legal for color to play on point, for the game of gomoku
+            """
+        return point != PASS and ((self.empty >> int(point)) & 1) == 1
+
+    def play_move_gomoku(self, point, color):
+        """
+            Play a move of color on point, for the game of gomoku
+            Returns boolean: whether move was legal
+            """
+        assert is_black_white(color)
+        assert point != PASS
+        point = int(point)
+        bit = 1 << point
+        if not self.empty & bit:
+            return False
+        self.stones[color] |= bit
+        self.empty ^= bit
+        self.num_empty -= 1
+        # only the lines through the new stone can make a new five
+        if self.winner is None and self.point_check_game_end_gomoku(point):
+            self.winner = color
+            self.winning_move = point
+        self.current_player = GoBoardUtil.opponent(color)
+        return True
+
+    def undo_move(self, point):
+        """
+        Take back the gomoku move on point and give the turn back.
+        """
+        point = int(point)
+        bit = 1 << point
+        color = self.get_color(point)
+        assert is_black_white(color)
+        self.stones[color] ^= bit
+        self.empty |= bit
+        self.num_empty += 1
+        if point == self.winning_move:
+            self.winner = None
+            self.winning_move = None
+        self.current_player = GoBoardUtil.opponent(self.current_player)
+
+    # make and unmake only depend on play_move_gomoku and undo_move
+    make = SimpleGoBoard.make
+    unmake = SimpleGoBoard.unmake
+    unmake_to = SimpleGoBoard.unmake_to
+
+    def point_check_game_end_gomoku(self, point):
+        """
+            Check if the point causes the game end for the game of Gomoko.
+            """
+        color = self.get_color(point)
+        if not is_black_white(color):
+            return False
+        stones = self.stones[color]
+        masks = self.five_masks[point]
+        for i, shift in enumerate(self._shifts()):
+            # bit p of fives is set iff p, p + shift, ..., p + 4 * shift
+            # all hold a stone
+            pairs = stones & (stones >> shift)
+            fours = pairs & (pairs >> (2 * shift))
+            fives = fours & (stones >> (4 * shift))
+            if fives & masks[i]:
+                return True
+        return False
+
+    def check_game_end_gomoku(self):
+        """
+            Check if the game ends for the game of Gomoku.
+            """
+        return self.winner is not None, self.winner
+
+    def is_terminal(self):
+        """
+            The game is over: someone made five in a row or the board is full.
+            """
+        return self.winner is not None or self.num_empty == 0
+
+    def _point_to_coord(self, point):
+        if point is None:
+            return 'pass'
+        row, col = divmod(point, self.NS)
+        return row, col
+
+    def point_line_codes(self, point):
+        """
+        Line window codes of point in the 4 directions, see
+        SimpleGoBoard.point_line_codes. They are read from the bitboards
+        on every call instead of being kept up to date.
+        """
+        codes = []
+        for shift in self._shifts():
+            code = 0
+            for k in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+                p = point + k * shift
+                if k == 0:
+                    continue
+                elif 0 <= p < self.maxpoint:
+                    color = self.get_color(p)
+                else:
+                    color = BORDER
+                code |= color << (2 * (k + WINDOW_RADIUS))
+            codes.append(code)
+        return codes
+
+    def policy_priors(self, moves):
+        """
+        See SimpleGoBoard.policy_priors.
+        """
+        codes = np.array([self.point_line_codes(move)
+                          for move in moves.tolist()], dtype = np.int64)
+        return policy_values(codes.T.reshape(4, len(moves)),
+                             self.current_player)
+
+    # The gomoku pattern knowledge reads the board only through
+    # point_line_codes, so it is shared with SimpleGoBoard.
+    policy_type_search_move = SimpleGoBoard.policy_type_search_move
+    try_to_block_oppoent_immediate_win = \
+        SimpleGoBoard.try_to_block_oppoent_immediate_win
+    try_to_play_immediate_win = SimpleGoBoard.try_to_play_immediate_win
+    win_in_2_move = SimpleGoBoard.win_in_2_move
+    block_open_four = SimpleGoBoard.block_open_four
+    match_policy = SimpleGoBoard.match_policy
+    check_pattern = SimpleGoBoard.check_pattern
@@ -14,6 +14,13 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
 import numpy as np
 import re
 import signal
+import time
+
+"""
+Seconds of the timelimit kept back by genmove for choosing and
+sending the move
+"""
+GENMOVE_MARGIN = 0.5
 
 class GtpConnection():
 
@@ -57,7 +64,11 @@ class GtpConnection():
             "solve": self.solve_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "workers": self.workers_cmd,
+            "ponder": self.ponder_cmd,
+            "save_tree": self.save_tree_cmd,
+            "load_tree": self.load_tree_cmd
         }
         
         self.timelimit=59
@@ -72,7 +83,10 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "workers": (1, 'Usage: workers INT'),
+            "ponder": (1, 'Usage: ponder {on,off}'),
+            "load_tree": (1, 'Usage: load_tree FILE')
         }
     
     def set_playout_policy(self, args):
@@ -89,15 +103,13 @@ class GtpConnection():
             else:
                 self.respond("")
             return
-        all_moves=self.board.get_empty_points()
-        if len(all_moves) == 0:
+        if self.board.num_empty_points() == 0:
             self.respond('')
             return
         moveType, moves=self.go_engine.policy_moves(self.board, color)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(moveType+' '+sorted_moves)
 
@@ -177,8 +189,10 @@ class GtpConnection():
     def reset(self, size):
         """
         Reset the board to empty board of given size
+        and the engine, stopping its pondering
         """
         self.board.reset(size)
+        self.go_engine.reset(self.board)
 
     def board2d(self):
         return str(GoBoardUtil.get_twoD_board(self.board))
@@ -189,6 +203,7 @@ class GtpConnection():
 
     def quit_cmd(self, args):
         """ Quit game and exit the GTP interface """
+        self.go_engine.stop_pondering()
         self.respond()
         exit()
 
@@ -244,16 +259,18 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
 
     def play_cmd(self, args):
         """
         play a move args[1] for given color args[0] in {'b','w'}
+        The engine's tree follows the move, so the search already done
+        on it is kept.
         """
         try:
+            self.go_engine.stop_pondering()
             board_color = args[0].lower()
             board_move = args[1]
             if board_color != "b" and board_color !="w":
@@ -263,6 +280,7 @@ class GtpConnection():
             if args[1].lower() == 'pass':
                 self.board.play_move(PASS, color)
                 self.board.current_player = GoBoardUtil.opponent(color)
+                self.go_engine.update(PASS, color)
                 self.respond()
                 return
             coord = move_to_coord(args[1], self.board.size)
@@ -278,6 +296,7 @@ class GtpConnection():
             else:
                 self.debug_msg("Move: {}\nBoard:\n{}\n".
                                 format(board_move, self.board2d()))
+            self.go_engine.update(move, color)
             self.respond()
         except Exception as e:
             self.respond('{}'.format(str(e)))
@@ -286,6 +305,67 @@ class GtpConnection():
         self.timelimit = args[0]
         self.respond('')
 
+    def workers_cmd(self, args):
+        """
+        Set the number of processes of the search to args[0]
+        """
+        try:
+            n_workers = int(args[0])
+        except ValueError:
+            self.error(self.argmap["workers"][1])
+            return
+        if n_workers < 1:
+            self.error("number of workers must be at least 1")
+            return
+        self.go_engine.n_workers = n_workers
+        self.respond()
+
+    def ponder_cmd(self, args):
+        """
+        Turn searching during the opponent's turn on or off
+        """
+        if args[0].lower() not in ['on', 'off']:
+            self.error(self.argmap["ponder"][1])
+            return
+        self.go_engine.ponder = args[0].lower() == 'on'
+        if not self.go_engine.ponder:
+            self.go_engine.stop_pondering()
+        self.respond()
+
+    def save_tree_cmd(self, args):
+        """
+        Save the search tree of the engine to file args[0], only its
+        first args[1] plies if given
+        """
+        if len(args) not in [1, 2]:
+            self.error('Usage: save_tree FILE [PLIES]')
+            return
+        try:
+            plies = int(args[1]) if len(args) == 2 else None
+        except ValueError:
+            self.error('Usage: save_tree FILE [PLIES]')
+            return
+        try:
+            num_nodes = self.go_engine.save_snapshot(self.board, args[0],
+                                                     plies)
+        except OSError as e:
+            self.error(str(e))
+            return
+        self.respond(num_nodes)
+
+    def load_tree_cmd(self, args):
+        """
+        Load the search tree of the current position from file args[0],
+        a snapshot of save_tree. New games on a board of its size also
+        start from it.
+        """
+        try:
+            num_nodes = self.go_engine.load_snapshot(self.board, args[0])
+        except (ValueError, OSError) as e:
+            self.error(str(e))
+            return
+        self.respond(num_nodes)
+
     def handler(self, signum, fram):
         self.board = self.sboard
         raise Exception("unknown")
@@ -296,7 +376,6 @@ class GtpConnection():
             signal.alarm(int(self.timelimit)-1)
             winner,move = self.board.solve()
             self.board = self.sboard
-            signal.alarm(0)
             if move != "NoMove":
                 if move == None:
                     self.respond('{} {}'.format(winner, self.board._point_to_coord(move)))
@@ -306,11 +385,17 @@ class GtpConnection():
             self.respond('{}'.format(winner))
         except Exception as e:
             self.respond('{}'.format(str(e)))
+        finally:
+            # solve may raise before its search ends, and an alarm left
+            # pending would go off in the middle of a later command
+            signal.alarm(0)
 
     def genmove_cmd(self, args):
         """
         Generate a move for the color args[0] in {'b', 'w'}, for the game of gomoku.
         """
+        # genmove keeps to its own deadline, no alarm may cut it short
+        signal.alarm(0)
         board_color = args[0].lower()
         color = color_to_int(board_color)
         game_end, winner = self.board.check_game_end_gomoku()
@@ -320,30 +405,31 @@ class GtpConnection():
             else:
                 self.respond("resign")
             return
-        moves = self.board.get_empty_points()
-        board_is_full = (len(moves) == 0)
+        board_is_full = (self.board.num_empty_points() == 0)
         if board_is_full:
             self.respond("pass")
             return
         move=None
+        deadline = time.monotonic() + float(self.timelimit) - GENMOVE_MARGIN
         try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
-            signal.alarm(0)
+            move = self.go_engine.get_move(self.board, color, deadline)
         except Exception as e:
-            sys.stderr.write("timelimit")
+            traceback.print_exc(file=sys.stderr)
             sys.stderr.flush()
 
-        if move == None:
+        fallback = move == None
+        if fallback:
             move = self.go_engine.get_random_move(self.board)
             
         move_coord = point_to_coord(move, self.board.size)
         move_as_string = format_point(move_coord)
         if self.board.is_legal_gomoku(move, color):
             self.board.play_move_gomoku(move, color)
+            if fallback:
+                # the tree was not advanced past the random move
+                self.go_engine.reset(self.board)
             self.respond(move_as_string)
+            self.go_engine.start_pondering(self.board)
         else:
             self.respond("illegal move: {}".format(move_as_string))
 
@@ -360,8 +446,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves(self.board, color)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
     """
@@ -374,8 +459,7 @@ class GtpConnection():
         moves = GoBoardUtil.generate_legal_moves_gomoku(self.board)
         gtp_moves = []
         for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+            gtp_moves.append(self.board.geometry.point_names[move])
         sorted_moves = ' '.join(sorted(gtp_moves))
         self.respond(sorted_moves)
     
@@ -403,8 +487,7 @@ class GtpConnection():
     
     def gogui_rules_final_result_cmd(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
-        moves = self.board.get_empty_points()
-        board_full = (len(moves) == 0)
+        board_full = (self.board.num_empty_points() == 0)
         if board_full and not game_end:
             self.respond("draw")
             return
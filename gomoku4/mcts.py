@@ -3,238 +3,1071 @@
 This function is loosely based on https://github.com/Rochester-NRT/RocAlphaGo/blob/develop/AlphaGo/mcts.py
 """
 import os, sys
+import time
+import collections
+import traceback
+import multiprocessing
 import numpy as np
 import random
 from board_util import GoBoardUtil, BLACK, WHITE, PASS, EMPTY
 from gtp_connection import point_to_coord, format_point
+from simple_board import IMMEDIATE_WIN
 
 PASS = 'pass'
 
-def uct_val(node, child, exploration, max_flag): 
-    if child._n_visits == 0:
-        return float("inf")
-    if max_flag:
-        black = float(child._black_wins)/child._n_visits + child._has_knowledge + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
-        # print("black: " + str(black))
-        return black
-    else:
-        white = float(child._n_visits - child._black_wins)/child._n_visits + child._has_knowledge + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
-        # print("white: " + str(white))
-        return white
-        
+"""
+The RAVE equivalence parameter: the number of visits of a node at which
+its own and its all-moves-as-first win rates get about the same weight,
+see Tree.uct_values. 0 turns RAVE off.
+"""
+RAVE_K = 300
+
+"""
+Progressive widening: a node with n visits shows only its
+int(WIDENING_BASE * (n + 1) ** WIDENING_EXPONENT) children of highest
+prior to selection, see MCTS.width
+"""
+WIDENING_BASE = 2.0
+WIDENING_EXPONENT = 0.5
+
+"""
+The number of positions kept by a PriorCache
+"""
+PRIOR_CACHE_SIZE = 20000
+
+"""
+The number of playouts between two checks of whether the most visited
+root child is decided, see MCTS._search
+"""
+EARLY_STOP_INTERVAL = 50
+
+"""
+The number of nodes an MCTS tree may have. Beyond it, the nodes with
+fewest visits are pruned until PRUNE_FRACTION of them are left,
+see Tree.prune
+"""
+MAX_NODES = 1000000
+PRUNE_FRACTION = 0.5
+
+"""
+The first fields of the header of a tree snapshot file, see MCTS.save
+"""
+SNAPSHOT_MAGIC = 0x4d435453
+SNAPSHOT_VERSION = 1
+
+"""
+The root of the tree is always node ROOT, see Tree.compact
+"""
+ROOT = 0
+
+"""
+Parent of the root, and the move of the root
+"""
+NO_NODE = -1
 
 def game_result(board):
-    game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
-    if game_end:
-        return winner
-    if board_full:
+    if not board.is_terminal():
+        return None
+    if board.winner is None:
         return 'draw'
-    return None
+    return board.winner
 
-def point_game_result(board, point):
+
+def virtual_loss(length, color):
+    """
+    Black wins to add along a path of length nodes, from a root with
+    color to play, so that every move on the path counts as a loss for
+    the player who chose it. The root was not chosen by anyone.
+    """
+    loss = np.zeros(length, dtype = np.int32)
+    loss[1::2] = color == WHITE
+    loss[2::2] = color == BLACK
+    return loss
+
+def batch_rollout(cells, toplay, winner, NS):
+    """
+    Play uniformly random rollouts of many games at once, one game
+    per row of numpy arrays, until each game has a five or is full.
+    Arguments:
+    cells -- games x maxpoint board arrays, see SimpleGoBoard.board.
+             They are modified.
+    toplay -- the color to play in each game
+    winner -- the winner of each game, EMPTY if the game is still on
+    NS -- the row length of the boards
+    Returns:
+    the winner of each game, EMPTY for a draw
+    """
+    games, maxpoint = cells.shape
+    rows = np.arange(games)
+    # a random order of the empty points of each game, they sort first
+    keys = np.random.random_sample((games, maxpoint))
+    keys[cells != EMPTY] = 2.0
+    order = np.argsort(keys, axis = 1)
+    num_empty = (cells == EMPTY).sum(axis = 1)
+    winner = winner.copy()
+    color = toplay.copy()
+    # offsets of the 9 cells centered on a move, in each direction
+    offsets = np.array([[k * shift for k in range(-4, 5)]
+                        for shift in [1, NS, NS + 1, NS - 1]])
+    for t in range(num_empty.max(initial = 0)):
+        active = rows[(winner == EMPTY) & (t < num_empty)]
+        if len(active) == 0:
+            break
+        moves = order[active, t]
+        c = color[active]
+        cells[active, moves] = c
+        # points off the array are clipped to the corner BORDER points
+        points = np.clip(moves[:, None, None] + offsets, 0, maxpoint - 1)
+        same = cells[active[:, None, None], points] == c[:, None, None]
+        before = np.cumprod(same[:, :, 3::-1], axis = 2).sum(axis = 2)
+        after = np.cumprod(same[:, :, 5:], axis = 2).sum(axis = 2)
+        five = (before + after >= 4).any(axis = 1)
+        winner[active[five]] = c[five]
+        color[active] = BLACK + WHITE - c
+    return winner
+
+def ranked_moves(board):
+    """
+    The empty points of board and their priors, see
+    policy_type_search_move, by decreasing prior and then by point.
+    """
     moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
-    if board_full:
-        return 'draw'
-    if board.point_check_game_end_gomoku(point):
-        result = board.board[point]
-        assert (result == BLACK or result == WHITE)
-        return result
-    return None
+    priors = board.policy_priors(moves)
+    order = np.lexsort((moves, -priors))
+    return moves[order], priors[order]
+
+class PriorCache(object):
+    """
+    A bounded LRU cache of ranked_moves, keyed by the board size, the
+    position code and the player to move. The same positions are expanded
+    again in later playouts, after the tree is cleared, and in later games.
+    The cached arrays are read-only.
+    hits, misses -- number of lookups found and not found in the cache
+    """
+    def __init__(self, capacity=PRIOR_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def ranked_moves(self, board):
+        key = (board.size, board.code(), board.current_player)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = ranked_moves(board)
+        for array in entry:
+            array.flags.writeable = False
+        self.entries[key] = entry
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+        return entry
 
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
 
-def undo(board,move):
-    board.board[move] = EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+"""
+The PriorCache shared by all trees of this process
+"""
+PRIOR_CACHE = PriorCache()
+
+def _worker_search(args):
+    """
+    Grow an independent tree in a worker process of a root parallel
+    search, see MCTS.get_move.
+    Returns the moves, visits and black wins of the root children.
+    """
+    board, toplay, num_simulation, exploration, rave_k, widening, \
+        transpositions, max_nodes, batch_size, deadline, seed = args
+    # workers must not all play the same rollouts
+    random.seed(seed)
+    np.random.seed(seed)
+    mcts = MCTS(rave_k, widening, transpositions, max_nodes)
+    mcts.toplay = toplay
+    mcts.exploration = exploration
+    mcts._search(board, toplay, num_simulation, batch_size, deadline)
+    tree = mcts.tree
+    edges = tree.edges(ROOT)
+    visits, black_wins = tree.child_stats(ROOT)
+    return tree.move[edges.start : edges.stop].copy(), visits, black_wins
 
 
-class TreeNode(object):
+class Tree(object):
     """
-    A node in the MCTS tree.
+    The MCTS tree stored as a struct of arrays, in two sets: the nodes,
+    which are positions, and the edges, which are the moves from them.
+    For node i:
+        visits[i], black_wins[i] -- playout statistics
+        expanded[i] -- whether the edges of i have been created
+        proven[i] -- the winner of the position with best play once
+                     the solver has proven it, else EMPTY, see prove
+        the edges of i are
+            first_edge[i] .. first_edge[i] + num_edges[i] - 1
+            ordered by decreasing prior
+    For edge e:
+        move[e]  -- the move
+        prior[e] -- knowledge of the move, see policy_type_search_move
+        child[e] -- the node reached by the move, NO_NODE until the edge
+                    is first selected, see child_node
+        amaf_visits[e], amaf_black_wins[e] -- all-moves-as-first statistics,
+                    of the playouts through the node of e in which move[e]
+                    was played later by the same player, see update_amaf
+    With transpositions, all edges that lead to the same position share
+    its node, found in table by position code and player to move, so the
+    tree is a DAG and the statistics of a position are pooled over all
+    move orders that reach it. Otherwise each edge gets its own node.
+    The edges of a node are contiguous. A node may have edges for only
+    some of its moves, those of highest prior, see widen. Adding edges
+    moves the block to the end of the edge arrays, and leaves unused edges
+    behind until the next compact.
+    The arrays grow by doubling when they are full. They never shrink,
+    the nodes freed by prune are used again.
+    The ranked moves of a position come from prior_cache.
     """
-    version = 0.22
-    name = "MCTS Player"
-    def __init__(self, parent):
+    def __init__(self, capacity=1024, prior_cache=PRIOR_CACHE,
+                 transpositions=False):
+        self.capacity = capacity
+        self.edge_capacity = capacity
+        self.prior_cache = prior_cache
+        self.transpositions = transpositions
+        self.prunes = 0
+        self.visits = np.zeros(capacity, dtype = np.int32)
+        self.black_wins = np.zeros(capacity, dtype = np.int32)
+        self.first_edge = np.zeros(capacity, dtype = np.int32)
+        self.num_edges = np.zeros(capacity, dtype = np.int32)
+        self.expanded = np.zeros(capacity, dtype = np.bool_)
+        self.proven = np.zeros(capacity, dtype = np.int8)
+        self.move = np.zeros(capacity, dtype = np.int32)
+        self.prior = np.zeros(capacity, dtype = np.int32)
+        self.child = np.zeros(capacity, dtype = np.int32)
+        self.amaf_visits = np.zeros(capacity, dtype = np.int32)
+        self.amaf_black_wins = np.zeros(capacity, dtype = np.int32)
+        self.clear()
+
+    def _node_arrays(self):
+        return ['visits', 'black_wins', 'first_edge', 'num_edges', 'expanded',
+                'proven']
+
+    def _edge_arrays(self):
+        return ['move', 'prior', 'child', 'amaf_visits', 'amaf_black_wins']
+
+    def clear(self):
+        """
+        Drop all nodes but a new, unexpanded root.
+        """
+        self.num_nodes = 1
+        self.edges_used = 0
+        self._init(self._node_arrays(), ROOT, 1)
+        self.table = {}
+
+    def _init(self, names, start, n):
+        for name in names:
+            getattr(self, name)[start : start + n] = 0
+
+    def _grow(self, names, used, capacity, needed):
+        """
+        Copy the arrays names, of which used entries are in use, to arrays
+        of at least needed entries. Returns the new capacity.
+        """
+        if needed <= capacity:
+            return capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in names:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype = old.dtype)
+            new[:used] = old[:used]
+            setattr(self, name, new)
+        return capacity
+
+    def _new_node(self):
+        self.capacity = self._grow(self._node_arrays(), self.num_nodes,
+                                   self.capacity, self.num_nodes + 1)
+        node = self.num_nodes
+        self._init(self._node_arrays(), node, 1)
+        self.num_nodes += 1
+        return node
+
+    def edges(self, node):
+        """ The range of the edges of node """
+        first = self.first_edge[node]
+        return range(first, first + self.num_edges[node])
+
+    def is_leaf(self, node):
+        """
+        Check if leaf node (i.e. no nodes below this have been expanded).
         """
-        parent is set when a node gets expanded
+        return self.num_edges[node] == 0
+
+    def expand(self, node, board, width=None):
+        """
+        Create the edges of node for the width empty points of board
+        of highest prior, for all of them if width is None.
+        """
+        self.widen(node, board, width)
+        self.expanded[node] = True
+
+    def widen(self, node, board, width=None):
+        """
+        Make sure that node has edges for the width moves of highest
+        prior, or for all moves if width is None or larger. The board must
+        be the position of node. The edges are created at least twice
+        as many at a time, so a block is moved only a few times.
         """
-        self._parent = parent
-        self._children = {}  # a map from move to TreeNode
-        self._n_visits = 0
-        self._black_wins = 0
-        self._expanded = False
-        self._move = None
-        self._has_knowledge = 0
+        n = int(self.num_edges[node])
+        num_moves = board.num_empty_points()
+        width = num_moves if width is None else min(width, num_moves)
+        if width <= n:
+            return
+        moves, priors = self.prior_cache.ranked_moves(board)
+        new_n = min(max(width, 2 * n), num_moves)
+        first = self.edges_used
+        self.edge_capacity = self._grow(self._edge_arrays(), first,
+                                        self.edge_capacity, first + new_n)
+        self._init(self._edge_arrays(), first, new_n)
+        if n > 0:
+            old = self.first_edge[node]
+            assert (self.move[old : old + n] == moves[:n]).all()
+            for name in self._edge_arrays():
+                array = getattr(self, name)
+                array[first : first + n] = array[old : old + n]
+        self.move[first + n : first + new_n] = moves[n:new_n]
+        self.prior[first + n : first + new_n] = priors[n:new_n]
+        self.child[first + n : first + new_n] = NO_NODE
+        self.first_edge[node] = first
+        self.num_edges[node] = new_n
+        self.edges_used += new_n
 
-    def expand(self, board, color, is_root_child):
+    def child_node(self, edge, board):
         """
-        Expands tree by creating new children.
+        The node reached by edge, created if needed. board must be the
+        position after the move of edge.
         """
-        moves = board.get_empty_points()
-        for move in moves:
-            if move not in self._children:
-                self._children[move] = TreeNode(self)
-                self._children[move]._move = move
-                
-                #filter the best move
-                # if is_root_child:
-                self._children[move]._has_knowledge = board.policy_type_search_move(move)
+        node = int(self.child[edge])
+        if node != NO_NODE:
+            return node
+        key = None
+        if self.transpositions:
+            key = (board.code(), board.current_player)
+            node = self.table.get(key, NO_NODE)
+        if node == NO_NODE:
+            node = self._new_node()
+            if key is not None:
+                self.table[key] = node
+        self.child[edge] = node
+        return node
 
-        self._expanded = True
+    def child_proven(self, node, width=None):
+        """
+        The proven winners of the nodes reached by the first width edges
+        of node, of all edges if width is None, EMPTY for nodes not
+        created yet.
+        """
+        first = self.first_edge[node]
+        n = self.num_edges[node]
+        last = first + (n if width is None else min(width, n))
+        child = self.child[first:last]
+        return np.where(child != NO_NODE, self.proven[child], EMPTY)
 
-    def select(self, exploration, max_flag):
+    def child_stats(self, node, width=None):
+        """
+        The visits and black wins of the nodes reached by the first width
+        edges of node, of all edges if width is None, 0 for nodes not
+        created yet.
         """
-        Select move among children that gives maximizes UCT. 
-        If number of visits are zero for a node, value for that node is infinite, so definitely will get selected
+        first = self.first_edge[node]
+        n = self.num_edges[node]
+        last = first + (n if width is None else min(width, n))
+        child = self.child[first:last]
+        created = child != NO_NODE
+        return (np.where(created, self.visits[child], 0),
+                np.where(created, self.black_wins[child], 0))
+
+    def uct_values(self, node, exploration, max_flag, rave_k=0, width=None):
+        """
+        UCT values of the first width edges of node, of all edges
+        if width is None, computed together.
+        With max_flag the win rate is the one of black, else of white.
+        With rave_k > 0 the win rate of a child with n visits is blended
+        with its all-moves-as-first win rate, with weight
+        beta = sqrt(rave_k / (3n + rave_k)) for the latter, so it fades out
+        as the child gets real visits.
+        The prior knowledge of a move is added to its value.
+        If a child has no statistics at all, its value is infinite, so it definitely will get selected
+        A child proven to be won by the player to move is also infinite,
+        and one proven to be lost is minus infinite, so it is selected
+        only if all children are lost.
+        """
+        first = self.first_edge[node]
+        visits, wins = self.child_stats(node, width)
+        last = first + len(visits)
+        amaf_visits = self.amaf_visits[first:last]
+        amaf_wins = self.amaf_black_wins[first:last]
+        if not max_flag:
+            wins = visits - wins
+            amaf_wins = amaf_visits - amaf_wins
+        unvisited = visits == 0
+        n = np.maximum(visits, 1)
+        rate = wins / n
+        if rave_k > 0:
+            beta = np.sqrt(rave_k / (3 * visits + rave_k))
+            rate = (1 - beta) * rate + \
+                   beta * amaf_wins / np.maximum(amaf_visits, 1)
+            unvisited &= amaf_visits == 0
+        values = rate + self.prior[first:last] + \
+                 exploration * np.sqrt(np.log(max(self.visits[node], 1)) / n)
+        values[unvisited] = np.inf
+        proven = self.child_proven(node, width)
+        mover = BLACK if max_flag else WHITE
+        values[proven == mover] = np.inf
+        values[proven == GoBoardUtil.opponent(mover)] = -np.inf
+        return values
+
+    def select(self, node, exploration, max_flag, rave_k=0, width=None):
+        """
+        Select the edge of node that maximizes UCT, the first one on ties,
+        among its first width edges.
 
         It uses: argmax(child_num_black_wins/child_num_vists + C * sqrt(2 * ln * Parent_num_vists/child_num_visits) )
+        blended with RAVE if rave_k > 0, see uct_values.
         Returns:
-        A tuple of (move, next_node)
+        the edge
         """
-        return max(self._children.items(), key=lambda items:uct_val(self, items[1], exploration, max_flag))
-        
-    def update(self, leaf_value):
+        values = self.uct_values(node, exploration, max_flag, rave_k, width)
+        return self.first_edge[node] + int(np.argmax(values))
+
+    def update_path(self, path, leaf_value):
         """
-        Update node values from leaf evaluation.
-        Arguments:
-        leaf_value -- the value of subtree evaluation from the current player's perspective.
-        
-        Returns:
-        None
+        Update the statistics of all nodes on the path from the root
+        to the leaf of a playout. The nodes of a path are distinct,
+        since every move adds a stone.
+        """
+        self.visits[path] += 1
+        self.black_wins[path] += leaf_value
+
+    def prove(self, path, color, num_moves):
         """
-        self._black_wins += leaf_value
-        self._n_visits += 1
+        Propagate the proven winner of the last node of path up the path
+        with the minimax rules: a node is won by the player to move if
+        one child is won by them, and lost if it has edges for all its
+        moves and all their nodes are won by the opponent. Stops at the
+        first node that cannot be proven.
+        color is the player to move and num_moves the number of empty
+        points at the first node of path.
+        """
+        for i in range(len(path) - 2, -1, -1):
+            node = path[i]
+            toplay = color if i % 2 == 0 else GoBoardUtil.opponent(color)
+            proven = self.child_proven(node)
+            if (proven == toplay).any():
+                self.proven[node] = toplay
+            elif self.num_edges[node] == num_moves - i and \
+                 (proven == GoBoardUtil.opponent(toplay)).all():
+                self.proven[node] = GoBoardUtil.opponent(toplay)
+            else:
+                return
 
-    def update_recursive(self, leaf_value):
+    def update_amaf(self, path, color, final_board, leaf_value):
+        """
+        Update the all-moves-as-first statistics of the edges of the
+        nodes on the path of a playout, color to play at the root.
+        final_board is the board at the end of the playout. Stones are
+        never removed in gomoku, so the move of an edge was played later in
+        the playout, by the player to move at its node, exactly if its
+        point has that player's color on final_board.
         """
-        Like a call to update(), but applied recursively for all ancestors.
+        for node in path:
+            n = self.num_edges[node]
+            if n > 0:
+                block = slice(self.first_edge[node],
+                              self.first_edge[node] + n)
+                played = final_board[self.move[block]] == color
+                self.amaf_visits[block] += played
+                self.amaf_black_wins[block] += played * leaf_value
+            color = GoBoardUtil.opponent(color)
+
+    def find_edge(self, node, move):
+        """ The edge of node with move, or NO_NODE """
+        if not self.expanded[node]:
+            return NO_NODE
+        edges = self.edges(node)
+        found = np.flatnonzero(self.move[edges.start : edges.stop] == move)
+        if len(found) == 0:
+            return NO_NODE
+        return edges.start + int(found[0])
+
+    def find_child(self, node, move):
+        """ The node reached from node by move, or NO_NODE """
+        edge = self.find_edge(node, move)
+        if edge == NO_NODE:
+            return NO_NODE
+        return int(self.child[edge])
 
-        Note: it is important that this happens from the root downward so that 'parent' visit
-        counts are correct.
+    def prune(self, target):
         """
-        # If it is not root, this node's parent should be updated first.
-        if self._parent:
-            self._parent.update_recursive(leaf_value)
-        self.update(leaf_value)
+        Drop the nodes with fewest visits, so that at most target nodes
+        are left, the root included, and count the prune in prunes.
+        The edges to the least visited nodes are cut, and compact then
+        drops every node the root no longer reaches. With transpositions
+        a node shared by several parents can have more visits than each of
+        them, so it can be dropped along with them, and fewer than target
+        nodes may be left.
+        The edges to dropped nodes are kept with their priors and
+        all-moves-as-first statistics, and get new nodes when they are
+        selected again.
+        """
+        assert target >= 1
+        if self.num_nodes <= target:
+            return
+        visits = np.sort(self.visits[1:self.num_nodes])
+        threshold = visits[len(visits) - target]
+        child = self.child[:self.edges_used]
+        created = child != NO_NODE
+        cut = created & (self.visits[child] <= threshold)
+        child[cut] = NO_NODE
+        self.compact(ROOT)
+        self.prunes += 1
 
-    def is_leaf(self):
+    def _breadth_first(self, root, plies=None):
         """
-        Check if leaf node (i.e. no nodes below this have been expanded).
+        The nodes reached from root in at most plies moves, all of them if
+        plies is None, in breadth first order, and their edges in the same
+        order.
+        Returns:
+        the nodes, the edges, the index of the first edge of each node
+        among the edges, and the index of each node among the nodes,
+        NO_NODE if it is not one of them
         """
-        return self._children == {}
+        keep = [root]
+        depth = [0]
+        index = np.full(self.num_nodes, NO_NODE, dtype = np.int32)
+        index[root] = ROOT
+        keep_edges = []
+        new_first = []
+        i = 0
+        while i < len(keep):
+            node = keep[i]
+            edges = self.edges(node)
+            new_first.append(len(keep_edges))
+            keep_edges.extend(edges)
+            if plies is None or depth[i] < plies:
+                for child in self.child[edges.start : edges.stop].tolist():
+                    if child != NO_NODE and index[child] == NO_NODE:
+                        index[child] = len(keep)
+                        keep.append(child)
+                        depth.append(depth[i] + 1)
+            i += 1
+        keep = np.array(keep, dtype = np.intp)
+        keep_edges = np.array(keep_edges, dtype = np.intp)
+        return keep, keep_edges, new_first, index
 
-    def is_root(self):
-        return self._parent is None
+    def snapshot(self, plies=None):
+        """
+        Copies of the node and edge arrays, by name, of the nodes reached
+        from the root in at most plies moves, see _breadth_first. The edges
+        of the last ply are kept, without their nodes.
+        """
+        keep, keep_edges, new_first, index = self._breadth_first(ROOT, plies)
+        arrays = {}
+        for name in self._node_arrays():
+            arrays[name] = getattr(self, name)[keep]
+        for name in self._edge_arrays():
+            arrays[name] = getattr(self, name)[keep_edges]
+        arrays['first_edge'][:] = new_first
+        child = arrays['child']
+        child[child != NO_NODE] = index[child[child != NO_NODE]]
+        return arrays
+
+    def restore(self, arrays, num_nodes, num_edges):
+        """
+        Use arrays, by name as returned by snapshot, as the arrays of the
+        tree, which has num_nodes nodes and num_edges edges. They may be
+        longer and are used in place until they have to grow, so they
+        can be memory mapped, copy on write. The transposition table
+        starts empty.
+        """
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.capacity = len(arrays['visits'])
+        self.edge_capacity = len(arrays['move'])
+        self.num_nodes = num_nodes
+        self.edges_used = num_edges
+        self.table = {}
+
+    def compact(self, root):
+        """
+        Make node root the new ROOT, and drop all nodes that cannot be
+        reached from it. The kept nodes are moved to the front of the node
+        arrays in breadth first order, and their edges to the front of the
+        edge arrays in the same order, which keeps them contiguous.
+        """
+        keep, keep_edges, new_first, index = self._breadth_first(root)
+        for name in self._node_arrays():
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        for name in self._edge_arrays():
+            array = getattr(self, name)
+            array[:len(keep_edges)] = array[keep_edges]
+        self.first_edge[:len(keep)] = new_first
+        child = self.child[:len(keep_edges)]
+        child[child != NO_NODE] = index[child[child != NO_NODE]]
+        self.num_nodes = len(keep)
+        self.edges_used = len(keep_edges)
+        self.table = {key: int(index[node])
+                      for key, node in self.table.items()
+                      if index[node] != NO_NODE}
 
 
 class MCTS(object):
-    def __init__(self):
-        self._root = TreeNode(None)
+    def __init__(self, rave_k=RAVE_K, widening=True, transpositions=False,
+                 max_nodes=MAX_NODES):
+        """
+        rave_k is the RAVE equivalence parameter, see Tree.uct_values
+        widening turns on progressive widening, see width
+        transpositions shares the nodes of transposed positions, see Tree
+        max_nodes is the node budget of the tree, see Tree.prune
+        """
+        self.tree = Tree(transpositions = transpositions)
         self.toplay = BLACK
-        
+        self.rave_k = rave_k
+        self.widening = widening
+        self.transpositions = transpositions
+        self.max_nodes = max_nodes
+        self.saved = 0
+
+    def width(self, node):
+        """
+        The number of edges of node, of highest prior, that selection
+        considers. None for all of them.
+        """
+        if not self.widening:
+            return None
+        visits = self.tree.visits[node]
+        return int(WIDENING_BASE * (visits + 1) ** WIDENING_EXPONENT)
+
     def _playout(self, board, color):
         """
         Run a single playout from the root to the given depth, getting a value at the leaf and
-        propagating it back through its parents. State is modified in-place, so a copy must be
-        provided.
+        propagating it back through its parents. The moves are played on board with make,
+        and are all taken back before returning, so no copy is needed.
 
         Arguments:
-        board -- a copy of the board.
+        board -- the board at the root.
         color -- color to play
-        
+
 
         Returns:
         None
         """
-        node = self._root 
+        start = board.num_moves
+        toplay = color
+        try:
+            path, color = self._select_leaf(board, color)
+            assert board.current_player == color
+            proven = self.tree.proven[path[-1]]
+            if proven != EMPTY:
+                leaf_value = 1 if proven == BLACK else 0
+            else:
+                leaf_value = self._evaluate_rollout(board, color)
+            final_board = board.board.copy()
+        finally:
+            board.unmake_to(start)
+        # Update value and visit count of nodes in this traversal.
+        self.tree.update_path(path, leaf_value)
+        if self.rave_k > 0:
+            self.tree.update_amaf(path, toplay, final_board, leaf_value)
+
+    def _select_leaf(self, board, color):
+        """
+        Descend from the root to a leaf or to a node with a proven winner,
+        playing the moves on board with make, and expand the leaf.
+        A leaf that is found to be proven, because the game ended there
+        or because it has a winning move, is propagated up the path,
+        see Tree.prove.
+        Returns:
+        the path of nodes from the root and the color to play at the leaf
+        """
+        tree = self.tree
+        node = ROOT
+        path = [ROOT]
+        toplay = color
+        num_moves = board.num_empty_points()
         # This will be True olny once for the root
-        if not node._expanded:
-            node.expand(board, color, True)
-        while not node.is_leaf():
-            # Greedily select next move.                
+        if not tree.expanded[node]:
+            tree.expand(node, board, self.width(node))
+            self._find_win(node, board)
+        while not tree.is_leaf(node) and tree.proven[node] == EMPTY:
+            width = self.width(node)
+            if width is not None:
+                tree.widen(node, board, width)
+            # Greedily select next move.
             max_flag = color == BLACK
-            move, next_node = node.select(self.exploration,max_flag)
-            # if move!=PASS:
-            #     assert board.is_legal_gomoku(move, color)
-            # if move == PASS:
-            #     move = None
-            board.play_move_gomoku(move, color)
-            color = GoBoardUtil.opponent(color) 
-            node = next_node
-        assert node.is_leaf()
-        if not node._expanded:
-            node.expand(board, color, False)
-
-        assert board.current_player == color
-        leaf_value = self._evaluate_rollout(board, color)  
-        # Update value and visit count of nodes in this traversal.
-        node.update_recursive(leaf_value)
+            edge = tree.select(node, self.exploration, max_flag, self.rave_k,
+                               width)
+            board.make(tree.move[edge])
+            node = tree.child_node(edge, board)
+            if board.winner is not None:
+                tree.proven[node] = board.winner
+            color = GoBoardUtil.opponent(color)
+            path.append(node)
+        if not tree.expanded[node] and tree.proven[node] == EMPTY:
+            tree.expand(node, board, self.width(node))
+            self._find_win(node, board)
+        if tree.proven[node] != EMPTY:
+            tree.prove(path, toplay, num_moves)
+        return path, color
+
+    def _find_win(self, node, board):
+        """
+        Prove node, the position of board, won by the player to move if
+        one of its moves makes five, which point_check_game_end_gomoku
+        checks when the move is made. Only moves with the prior of an
+        immediate win can, and they are the first edges.
+        """
+        tree = self.tree
+        for edge in tree.edges(node):
+            if tree.prior[edge] < IMMEDIATE_WIN:
+                return
+            board.make(tree.move[edge])
+            winner = board.winner
+            if winner is not None:
+                tree.proven[tree.child_node(edge, board)] = winner
+                tree.proven[node] = winner
+            board.unmake()
+            if winner is not None:
+                return
+
+    def _playout_batch(self, board, color, batch_size):
+        """
+        Run batch_size playouts together. The leaves are selected one
+        after the other, with a virtual loss on the path of each selected
+        leaf, so the next selections spread over other paths. The rollouts
+        of all the leaves are then played at once by batch_rollout, and
+        the virtual losses are replaced by the results.
+        """
+        tree = self.tree
+        start = board.num_moves
+        paths = []
+        losses = []
+        cells = np.empty((batch_size, board.maxpoint), dtype = np.int8)
+        toplay = np.empty(batch_size, dtype = np.int8)
+        winner = np.empty(batch_size, dtype = np.int8)
+        try:
+            for k in range(batch_size):
+                path, leaf_color = self._select_leaf(board, color)
+                cells[k] = board.board
+                toplay[k] = leaf_color
+                # a proven leaf is not played out
+                winner[k] = tree.proven[path[-1]]
+                board.unmake_to(start)
+                loss = virtual_loss(len(path), color)
+                tree.visits[path] += 1
+                tree.black_wins[path] += loss
+                paths.append(path)
+                losses.append(loss)
+        finally:
+            board.unmake_to(start)
+            for path, loss in zip(paths, losses):
+                tree.visits[path] -= 1
+                tree.black_wins[path] -= loss
+        winner = batch_rollout(cells, toplay, winner, board.NS)
+        for path, result, final_board in zip(paths, winner, cells):
+            leaf_value = 1 if result == BLACK else 0
+            tree.update_path(path, leaf_value)
+            if self.rave_k > 0:
+                tree.update_amaf(path, color, final_board, leaf_value)
 
     def _evaluate_rollout(self, board, toplay):
         """
-        Use the rollout policy to play until the end of the game, returning +1 if the current
-        player wins, -1 if the opponent wins, and 0 if it is a tie.
+        Use the rollout policy to play until the end of the game, returning 1 if black
+        wins, and 0 otherwise. The moves are left on board, for the caller to take back.
         """
         result = game_result(board)
-        simulation_moves=[]
         moves = GoBoardUtil.generate_legal_moves_gomoku(board)
         while(result is None):
             move = moves.pop()
-            board.play_move_gomoku(move, board.current_player)
-            simulation_moves.append(move)
+            board.make(move)
             result = game_result(board)
-            # result = point_game_result(board, move)
-        for m in simulation_moves[::-1]:
-            undo(board, m)
 
         if result == BLACK:
             return 1
         else:
             return 0
 
-    def get_move(self, board, toplay, num_simulation, exploration):
+    def _search(self, board, toplay, num_simulation, batch_size=1,
+                deadline=None, stop=None, early_stop=False):
         """
-        Runs all playouts sequentially and returns the most visited move.
+        Runs playouts, in batches of batch_size playouts if batch_size > 1,
+        until num_simulation playouts are done, the time.monotonic()
+        deadline has passed or the threading.Event stop is set.
+        Any limit may be None, but not all of them.
+        The limits are checked between playouts, so a playout is never
+        cut short, and at least one playout is always run.
+        The tree is pruned between playouts when it has more than
+        max_nodes nodes.
+        With early_stop, the search also ends once the most visited root
+        child cannot be overtaken in the playouts left, see _decided.
+        This is checked every EARLY_STOP_INTERVAL playouts, and the
+        playouts left are stored in saved.
+        Returns the number of playouts run.
+        """
+        assert num_simulation is not None or deadline is not None or \
+               stop is not None
+        start = time.monotonic()
+        self.saved = 0
+        done = 0
+        next_check = EARLY_STOP_INTERVAL
+        while True:
+            n = batch_size
+            if num_simulation is not None:
+                n = min(n, num_simulation - done)
+            if n > 1:
+                self._playout_batch(board, toplay, n)
+            else:
+                self._playout(board, toplay)
+            done += n
+            if self.tree.num_nodes > self.max_nodes:
+                self.tree.prune(max(int(self.max_nodes * PRUNE_FRACTION), 1))
+            if num_simulation is not None and done >= num_simulation:
+                return done
+            if deadline is not None and time.monotonic() >= deadline:
+                return done
+            if stop is not None and stop.is_set():
+                return done
+            if early_stop and done >= next_check:
+                next_check = done + EARLY_STOP_INTERVAL
+                left = self._playouts_left(done, num_simulation, deadline,
+                                           start)
+                if left is not None and self._decided(left):
+                    self.saved = left
+                    return done
+
+    def _playouts_left(self, done, num_simulation, deadline, start):
+        """
+        The number of playouts _search has left after done playouts,
+        started at time start. Before a deadline, this is estimated from
+        the playout rate so far. None if there is no limit.
+        """
+        left = []
+        if num_simulation is not None:
+            left.append(num_simulation - done)
+        if deadline is not None:
+            now = time.monotonic()
+            rate = done / max(now - start, 1e-9)
+            left.append(int(rate * max(deadline - now, 0)) + 1)
+        return min(left) if left else None
+
+    def _decided(self, left):
+        """
+        Whether the most visited child of the root stays the most visited
+        after left more playouts, or the root is proven.
+        """
+        if self.tree.proven[ROOT] != EMPTY:
+            return True
+        visits, _ = self.tree.child_stats(ROOT)
+        if len(visits) == 0:
+            return False
+        top = np.sort(visits)[-2:]
+        second = top[0] if len(top) == 2 else 0
+        return top[-1] - second > left
+
+    def ponder(self, board, exploration, stop, batch_size=1):
+        """
+        Search from board, the position of the root, until stop is set.
+        Run on a thread while the opponent thinks, see Gomoku4.start_pondering.
+        board is used in place, so it must not be the board of the game.
+        """
+        self.exploration = exploration
+        try:
+            self._search(board, self.toplay, None, batch_size, stop=stop)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            sys.stderr.flush()
+
+    def _merge_root(self, board, results):
+        """
+        Add the root children statistics of worker trees, as returned by
+        _worker_search, to the children of the root, the position of board.
+        The root gets edges for all moves first, since the workers
+        may have widened it differently.
+        """
+        tree = self.tree
+        tree.widen(ROOT, board)
+        edges = tree.edges(ROOT)
+        moves = tree.move[edges.start : edges.stop]
+        order = np.argsort(moves)
+        for worker_moves, visits, black_wins in results:
+            index = edges.start + \
+                    order[np.searchsorted(moves, worker_moves, sorter=order)]
+            for edge, v, w in zip(index.tolist(), visits.tolist(),
+                                  black_wins.tolist()):
+                if v == 0:
+                    continue
+                board.make(tree.move[edge])
+                child = tree.child_node(edge, board)
+                board.unmake()
+                tree.visits[child] += v
+                tree.black_wins[child] += w
+            tree.visits[ROOT] += visits.sum()
+            tree.black_wins[ROOT] += black_wins.sum()
+
+    def get_move(self, board, toplay, num_simulation, exploration,
+                 n_workers=1, batch_size=1, deadline=None, early_stop=True):
+        """
+        Searches until num_simulation playouts are done or the
+        time.monotonic() deadline has passed, see _search, and returns
+        the most visited move.
+        With early_stop, the search ends as soon as the most visited move
+        is decided, which leaves the rest of the time on the clock.
+        With batch_size > 1 the playouts are run in batches, see
+        _playout_batch.
+        With n_workers > 1 the search is root parallel: n_workers - 1
+        worker processes each grow their own tree from board with the same
+        limits, while this process grows its tree. The root children
+        statistics of the workers are then added to this tree. The workers
+        can change the most visited move, so there is no early stop.
         """
         if self.toplay != toplay:
             sys.stderr.write("Dumping the subtree! \n")
             sys.stderr.flush()
-            self._root = TreeNode(None)
+            self.tree.clear()
         self.toplay = toplay
         self.exploration = exploration
-        for _ in range(num_simulation):
-            try:
-                board_copy = board.copy()
-                self._playout(board_copy, toplay)
-            except Exception as e:
-                break
-
-        # choose a move that has the most visit 
-        moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
-        # if not moves_ls:
-        #     return None
-        moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
-        move = moves_ls[0]
-        self.print_stat(board, self._root, toplay)
-        #self.good_print(board,self._root,self.toplay,10)
-        # if move[0] == PASS:
-        #     return None
-        assert board.is_legal_gomoku(move[0], toplay)
-        return move[0]
-        
-    def update_with_move(self, last_move):
-        """
-        Step forward in the tree, keeping everything we already know about the subtree, assuming
-        that get_move() has been called already. Siblings of the new root will be garbage-collected.
-        """
-        if last_move in self._root._children:
-            self._root = self._root._children[last_move]
+        start = time.monotonic()
+        visits = int(self.tree.visits[ROOT])
+        # make plays for board.current_player, and genmove may ask for
+        # the other player, so the board is switched for the search
+        player = board.current_player
+        board.current_player = toplay
+        try:
+            if n_workers <= 1:
+                self._search(board, toplay, num_simulation, batch_size,
+                             deadline, early_stop=early_stop)
+            else:
+                # the jobs are pickled on a thread of the pool while this
+                # process already searches on board, so they get copies
+                jobs = [(board.copy(), toplay, num_simulation, exploration,
+                         self.rave_k, self.widening, self.transpositions,
+                         self.max_nodes,
+                         batch_size, deadline, random.getrandbits(32))
+                        for _ in range(n_workers - 1)]
+                with multiprocessing.Pool(n_workers - 1) as pool:
+                    results = pool.map_async(_worker_search, jobs)
+                    self._search(board, toplay, num_simulation, batch_size,
+                                 deadline)
+                    self._merge_root(board, results.get())
+        finally:
+            board.current_player = player
+        self.print_rate(int(self.tree.visits[ROOT]) - visits,
+                        time.monotonic() - start)
+        if self.saved > 0:
+            sys.stderr.write("Early stop: {} playouts saved \n".format(
+                self.saved))
+            sys.stderr.flush()
+
+        # choose a proven win, else a move that has the most visit
+        # and is not proven lost, if there is one
+        visits, _ = self.tree.child_stats(ROOT)
+        proven = self.tree.child_proven(ROOT)
+        if (proven == toplay).any():
+            visits = proven == toplay
+        elif (proven != GoBoardUtil.opponent(toplay)).any():
+            visits = np.where(proven == GoBoardUtil.opponent(toplay), -1,
+                              visits)
+        best = self.tree.first_edge[ROOT] + int(np.argmax(visits))
+        move = int(self.tree.move[best])
+        self.print_stat(board, ROOT, toplay)
+        #self.good_print(board,ROOT,self.toplay,10)
+        assert board.is_legal_gomoku(move, toplay)
+        return move
+
+    def update_with_move(self, last_move, color=None):
+        """
+        Step forward in the tree, keeping everything we already know about the subtree.
+        Siblings of the new root are dropped by compacting the tree.
+        color is the player of last_move, by default the player to move at the root.
+        If it is another player, or last_move is not a child of the root,
+        the tree is not about the new position and is cleared.
+        """
+        if color is None:
+            color = self.toplay
+        child = NO_NODE
+        if color == self.toplay:
+            child = self.tree.find_child(ROOT, last_move)
+        if child != NO_NODE:
+            self.tree.compact(child)
         else:
-            self._root = TreeNode(None)
-        self._root._parent = None
-        self.toplay = GoBoardUtil.opponent(self.toplay)
+            self.tree.clear()
+        self.toplay = GoBoardUtil.opponent(color)
+
+    def save(self, filename, board, plies=None):
+        """
+        Write the tree, or its first plies plies, to filename, see
+        Tree.snapshot. board is the position of the root.
+        The file is a header of uint64 fields: SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION, board size, player to move, position code, number
+        of nodes and of edges. The node arrays and then the edge arrays
+        follow, as raw data, each one padded to a multiple of 8 bytes.
+        A temporary file replaces filename at the end, so a snapshot that
+        is memory mapped by load is never overwritten.
+        Returns the number of nodes written.
+        """
+        arrays = self.tree.snapshot(plies)
+        num_nodes = len(arrays['visits'])
+        header = np.array([SNAPSHOT_MAGIC, SNAPSHOT_VERSION, board.size,
+                           self.toplay, board.code(), num_nodes,
+                           len(arrays['move'])], dtype = np.uint64)
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(header.tobytes())
+            for name in self.tree._node_arrays() + self.tree._edge_arrays():
+                data = arrays[name].tobytes()
+                f.write(data + bytes(-len(data) % 8))
+        os.replace(temporary, filename)
+        return num_nodes
+
+    def load(self, filename, board):
+        """
+        Replace the tree by the snapshot written to filename by save,
+        memory mapped copy on write, so only the parts of it the search
+        reads are loaded. board must be the position of the snapshot's root.
+        Raises ValueError if filename is not a snapshot, or is of another
+        board size or position.
+        Returns the number of nodes loaded.
+        """
+        header = np.fromfile(filename, dtype = np.uint64, count = 7)
+        if len(header) < 7 or header[0] != SNAPSHOT_MAGIC or \
+           header[1] != SNAPSHOT_VERSION:
+            raise ValueError("{} is not a tree snapshot".format(filename))
+        size, toplay, code, num_nodes, num_edges = [int(field) for field
+                                                    in header[2:]]
+        if size != board.size:
+            raise ValueError("snapshot is for board size {}, not {}".format(
+                size, board.size))
+        if code != board.code() or toplay != board.current_player:
+            raise ValueError("snapshot is of another position")
+        tree = self.tree
+        offset = header.nbytes
+        arrays = {}
+        for names, n in [(tree._node_arrays(), num_nodes),
+                         (tree._edge_arrays(), num_edges)]:
+            for name in names:
+                dtype = getattr(tree, name).dtype
+                if n == 0:
+                    # arrays must not be empty to grow
+                    arrays[name] = np.zeros(1, dtype = dtype)
+                    continue
+                arrays[name] = np.memmap(filename, dtype = dtype, mode = 'c',
+                                         offset = offset, shape = (n,))
+                offset += n * dtype.itemsize + (-n * dtype.itemsize) % 8
+        tree.restore(arrays, num_nodes, num_edges)
+        self.toplay = toplay
+        return num_nodes
 
     def point_to_string(self, board_size, point):
         if point == None:
@@ -246,87 +1079,92 @@ class MCTS(object):
         """convert number representing player color to the appropriate character """
         int_to_color = {BLACK:"b", WHITE:"w"}
         try:
-           return int_to_color[i] 
+           return int_to_color[i]
         except:
             raise ValueError("Provided integer value for color is invalid")
 
     def good_print(self, board, node, color, num_nodes):
+        tree = self.tree
         cboard = board.copy()
         sys.stderr.write("\nTaking a tour of selection policy in tree! \n\n")
         sys.stderr.write(str(cboard.get_twoD_board()))
         sys.stderr.flush()
-        while not node.is_leaf():
-            if node._move != None:
-                if node._move != PASS:
-                    pointString = self.point_to_string(board.size, node._move)
-                else:
-                    pointString = node._move
-            else: 
-                pointString = 'Root'
+        pointString = 'Root'
+        while not tree.is_leaf(node):
             sys.stderr.write("\nMove: {} Numebr of children {}, Number of visits: {}\n"
-                .format(pointString,len(node._children),node._n_visits))
+                .format(pointString,tree.num_edges[node],tree.visits[node]))
             sys.stderr.flush()
             moves_ls = []
             max_flag = color == BLACK
-            for move,child in node._children.items():
-                uctval = uct_val(node,child,self.exploration,max_flag)
-                moves_ls.append((move,uctval,child))
+            uctvals = tree.uct_values(node,self.exploration,max_flag,self.rave_k)
+            visits, black_wins = tree.child_stats(node)
+            for edge, uctval, v, w in zip(tree.edges(node), uctvals, visits, black_wins):
+                moves_ls.append((tree.move[edge],uctval,v,w))
             moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
 
             if moves_ls:
                 sys.stderr.write("\nPrinting {} of {} childs that have highest UCT value \n\n".format(num_nodes, pointString))
                 sys.stderr.flush()
-                for i in range(num_nodes):
-                    move = moves_ls[i][0]
-                    child_val = moves_ls[i][1]
-                    child_node = moves_ls[i][2]
-                    if move !=PASS:
-                        sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {}\n"
-                            .format(self.point_to_string(cboard.size, move), child_val, child_node._n_visits, child_node._black_wins))
-                        sys.stderr.flush()
-                    else:
-                        sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {} \n"
-                            .format(move, child_val, child_node._n_visits, child_node._black_wins))
-                        sys.stderr.flush()
-            # Greedily select next move.                
+                for i in range(min(num_nodes, len(moves_ls))):
+                    move, child_val, visits, black_wins = moves_ls[i]
+                    sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {}\n"
+                        .format(self.point_to_string(cboard.size, move), child_val, visits, black_wins))
+                    sys.stderr.flush()
+            # Greedily select next move.
             max_flag = color == BLACK
-            move, next_node = node.select(self.exploration,max_flag)
-            if move==PASS:
-                move = None
+            edge = tree.select(node, self.exploration, max_flag, self.rave_k)
+            move = tree.move[edge]
             assert cboard.is_legal_gomoku(move, color)
             pointString = self.point_to_string(cboard.size, move)
             cboard.play_move_gomoku(move, color)
+            node = tree.child_node(edge, cboard)
             sys.stderr.write("\nBoard in simulation after chosing child {} in tree. \n".format(pointString))
             sys.stderr.write(str(cboard.get_twoD_board()))
             sys.stderr.flush()
-            color = GoBoardUtil.opponent(color) 
-            node = next_node
-        assert node.is_leaf()
+            color = GoBoardUtil.opponent(color)
+        assert tree.is_leaf(node)
         cboard.current_player = color
-        leaf_value = self._evaluate_rollout(cboard, color)  
+        leaf_value = self._evaluate_rollout(cboard, color)
         sys.stderr.write("\nWinner of simulation is: {} color, Black is 0 an \n".format(leaf_value))
         sys.stderr.flush()
 
+    def print_rate(self, playouts, seconds):
+        sys.stderr.write("Playouts: {} in {:.2f}s, {:.0f} playouts/s \n".format(
+            playouts, seconds, playouts / max(seconds, 1e-9)))
+        sys.stderr.flush()
+
     def print_stat(self, board, root, color):
+        tree = self.tree
         s_color = self.int_to_color(color)
-        sys.stderr.write("Numebr of children {} \n".format(len(root._children)))
+        sys.stderr.write("Numebr of children {} \n".format(tree.num_edges[root]))
+        sys.stderr.flush()
+        sys.stderr.write("Number of roots visits: {} \n".format(tree.visits[root]))
+        sys.stderr.flush()
+        if tree.proven[root] != EMPTY:
+            sys.stderr.write("Proven win for {} \n".format(
+                self.int_to_color(tree.proven[root])))
+            sys.stderr.flush()
+        sys.stderr.write("Tree: {} nodes, {} edges, {} prunes \n".format(
+            tree.num_nodes, tree.edges_used, tree.prunes))
         sys.stderr.flush()
-        sys.stderr.write("Number of roots visits: {} \n".format(root._n_visits))
+        cache = tree.prior_cache
+        sys.stderr.write("Prior cache: {} positions, {} hits, {} misses \n".format(
+            len(cache.entries), cache.hits, cache.misses))
         sys.stderr.flush()
         stats=[]
-        for move,node in root._children.items():
+        child_visits, child_black_wins = tree.child_stats(root)
+        for edge, visits, black_wins in zip(tree.edges(root),
+                                            child_visits.tolist(),
+                                            child_black_wins.tolist()):
             if color == BLACK:
-                wins = node._black_wins
+                wins = black_wins
             else:
-                wins = node._n_visits - node._black_wins
-            visits = node._n_visits
+                wins = visits - black_wins
             if visits:
-                win_rate = round(float(wins)/visits,2)    
+                win_rate = round(float(wins)/visits,2)
             else:
                 win_rate = 0
-            if move==PASS:
-                move = None
-            pointString = self.point_to_string(board.size, move)
+            pointString = self.point_to_string(board.size, tree.move[edge])
             stats.append((pointString,win_rate,wins,visits))
         sys.stderr.write("Statistics: {} \n".format(sorted(stats,key=lambda i:i[3],reverse=True)))
         sys.stderr.flush()
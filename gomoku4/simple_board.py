@@ -10,10 +10,138 @@ The board uses a 1-dimensional representation with padding
 """
 
 import numpy as np
+import random
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
                        MAXSIZE, NULLPOINT
+from geometry import board_geometry
 import alphabeta
+from patterns import WINDOW_RADIUS, CENTER_MASK, line_window_codes, \
+                     compile_patterns, match_codes, match_codes_array
+
+"""
+Seed of the Zobrist keys, see zobrist_keys
+"""
+ZOBRIST_SEED = 496
+
+"""
+Zobrist keys of each board size, see zobrist_keys
+"""
+_zobrist_keys = {}
+
+def zobrist_keys(size):
+    """
+    Random 64-bit Zobrist keys of a board size, one per point and color,
+    computed once per size. EMPTY points do not change the code,
+    so their keys are 0. The generator is seeded so codes are the same
+    in every run.
+    """
+    if size not in _zobrist_keys:
+        rng = random.Random(ZOBRIST_SEED)
+        keys = []
+        for point in range(board_geometry(size).maxpoint):
+            keys.append([0, rng.getrandbits(64), rng.getrandbits(64)])
+        _zobrist_keys[size] = keys
+    return _zobrist_keys[size]
+
+"""
+Line window tables of each board size, see line_window_tables
+"""
+_line_window_tables = {}
+
+def line_window_tables(size):
+    """
+    Tables for incremental updates of the line windows of a board size,
+    computed once per size. See patterns.py for the window encoding.
+    Returns
+    -------
+    index, value : lists of numpy arrays
+        placing a stone of color on point adds color * value[point]
+        to the window codes at flat positions index[point]
+    empty_codes : numpy array
+        the window codes of the empty board, the code of point in
+        direction d is at flat position d * maxpoint + point
+    """
+    if size in _line_window_tables:
+        return _line_window_tables[size]
+    geometry = board_geometry(size)
+    NS = geometry.NS
+    maxpoint = geometry.maxpoint
+    index = []
+    value = []
+    for point in range(maxpoint):
+        index.append([])
+        value.append([])
+    for d, shift in enumerate([1, NS, NS + 1, NS - 1]):
+        for k in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+            for q in range(max(0, -k * shift), 
+                           min(maxpoint, maxpoint - k * shift)):
+                # point q + k * shift is at offset k in the window of q
+                index[q + k * shift].append(d * maxpoint + q)
+                value[q + k * shift].append(1 << (2 * (k + WINDOW_RADIUS)))
+    index = [np.array(i, dtype = np.intp) for i in index]
+    value = [np.array(v, dtype = np.int64) for v in value]
+    empty_codes = line_window_codes(geometry.empty_board, NS)
+    _line_window_tables[size] = (index, value, empty_codes)
+    return _line_window_tables[size]
+
+"""
+The policy patterns of policy_type_search_move, from the highest
+priority down, with the priority of each class.
+"""
+IMMEDIATE_WIN = 40
+BLOCK_IMMEDIATE_WIN = 30
+WIN_IN_2 = 20
+BLOCK_OPEN_FOUR = 10
+POLICY_PATTERNS = [
+    # xxxx.
+    # xxx.x
+    # xx.xx
+    (IMMEDIATE_WIN, {'.oooo' : 0, 'o.ooo' : 1, 'oo.oo' : 2}),
+    # xoooo.
+    # ooo.o
+    # oo.oo
+    (BLOCK_IMMEDIATE_WIN, {'.xxxx' : 0, 'x.xxx' : 1, 'xx.xx' : 2}),
+    (WIN_IN_2, {'-.ooo-' : 1, '-o.oo-' : 2, 'o-o.o-o': 3}),
+    (BLOCK_OPEN_FOUR, {'.x-xx-' : 0,  
+                       '-x.xx-' : 2, 
+                       '.xx-x-': 0,
+                       '.-xxx-?' : 0, '-.xxx-?' : 1, '?.xxx--' : 1, 
+                       '-.xxx--': 1, 'x-x.x-x': 3})
+]
+
+"""
+Alphabet of the policy patterns, see patterns.py.
+'?' is own stone or BORDER.
+"""
+POLICY_ALPHABET = {'o': 'o', 'x': 'x', '-': '-', '?': 'o#', '.': '-'}
+
+"""
+POLICY_PATTERNS compiled once for each color to play
+"""
+POLICY_TABLES = {}
+for color in [BLACK, WHITE]:
+    POLICY_TABLES[color] = {}
+    for value, patterns in POLICY_PATTERNS:
+        POLICY_TABLES[color][value] = \
+            compile_patterns(patterns, color, POLICY_ALPHABET)
+
+def policy_values(codes, color):
+    """
+    The values of policy_type_search_move for color to play, of moves
+    given by a 4 x moves numpy array of their window codes, with the
+    cells of the moves cleared.
+    """
+    values = np.zeros(codes.shape[1], dtype = np.int32)
+    # the first class in POLICY_PATTERNS that matches is the value
+    for value, _ in reversed(POLICY_PATTERNS):
+        values[match_codes_array(POLICY_TABLES[color][value], codes)] = value
+    return values
+
+"""
+Single patterns compiled by check_pattern
+"""
+_check_pattern_tables = {}
 
 class SimpleGoBoard(object):
 
@@ -60,9 +188,18 @@ class SimpleGoBoard(object):
     def get_empty_points(self):
         """
         Return:
-            The empty points on the board
+            The empty points on the board, in increasing order
+            like the board scan they replace, since callers such as
+            genmove break ties between moves by this order
         """
-        return where1d(self.board == EMPTY)
+        return np.sort(self.empty_points[:self.num_empty])
+
+    def num_empty_points(self):
+        """
+        Return:
+            The number of empty points on the board
+        """
+        return self.num_empty
 
     def __init__(self, size):
         """
@@ -83,56 +220,167 @@ class SimpleGoBoard(object):
         self.ko_recapture = None
         self.current_player = BLACK
         self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.geometry = board_geometry(size)
+        self.board = self.geometry.empty_board.copy()
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self._initialize_empty_index()
+        self.neighbors = self.geometry.neighbors
+        self._initialize_line_codes()
+        self.zobrist = zobrist_keys(size)
+        self.position_code = 0
+        # winner is set by the move that makes five in a row
+        self.winner = None
+        self.winning_move = None
+        # moves played by make, there can be at most one per point
+        self.move_stack = np.zeros(size * size, dtype = np.int32)
+        self.num_moves = 0
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
+        """
+        Copy of the board that shares the tables which only depend on
+        the board size, the geometry and the line window tables, and
+        copies the mutable state. It does not run reset.
+        """
+        b = SimpleGoBoard.__new__(SimpleGoBoard)
+        b.size = self.size
+        b.NS = self.NS
+        b.WE = self.WE
         b.ko_recapture = self.ko_recapture
         b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
-        b.board = np.copy(self.board)
+        b.maxpoint = self.maxpoint
+        b.board = self.board.copy()
+        b.liberty_of = self.liberty_of.copy()
+        b.empty_points = self.empty_points.copy()
+        b.empty_index = self.empty_index.copy()
+        b.num_empty = self.num_empty
+        b.geometry = self.geometry
+        b.neighbors = self.neighbors
+        b.window_index = self.window_index
+        b.window_value = self.window_value
+        b.line_codes = self.line_codes.copy()
+        b.zobrist = self.zobrist
+        b.position_code = self.position_code
+        b.winner = self.winner
+        b.winning_move = self.winning_move
+        b.move_stack = self.move_stack.copy()
+        b.num_moves = self.num_moves
         return b
 
+    def make(self, point):
+        """
+        Play a gomoku move of current_player on point and push it
+        on the move stack, so unmake can take it back.
+        Returns boolean: whether move was legal
+        """
+        if not self.play_move_gomoku(point, self.current_player):
+            return False
+        self.move_stack[self.num_moves] = point
+        self.num_moves += 1
+        return True
+
+    def unmake(self):
+        """
+        Take back the last move of make. This restores all the state
+        it changed: stones, empty index, line codes, code and winner.
+        """
+        assert self.num_moves > 0
+        self.num_moves -= 1
+        self.undo_move(self.move_stack[self.num_moves])
+
+    def unmake_to(self, num_moves):
+        """
+        Take back moves of make until num_moves are left on the stack.
+        """
+        while self.num_moves > num_moves:
+            self.unmake()
+
+    def code(self):
+        """
+        Zobrist code of the stones on the board, kept up to date
+        by _place_stone and _remove_stone.
+        """
+        return self.position_code
+
+    def undo_move(self, point):
+        """
+        Take back the gomoku move on point and give the turn back.
+        """
+        assert is_black_white(self.board[point])
+        self._remove_stone(point)
+        if point == self.winning_move:
+            self.winner = None
+            self.winning_move = None
+        self.current_player = GoBoardUtil.opponent(self.current_player)
+
     def row_start(self, row):
         assert row >= 1
         assert row <= self.size
         return row * self.NS + 1
         
-    def _initialize_empty_points(self, board):
+    def _initialize_empty_index(self):
+        """
+        Build the index of empty points.
+        empty_points[:num_empty] holds the empty points, and
+        empty_index[point] is the position of point in empty_points.
+        Both are kept in sync by _add_empty and _remove_empty,
+        so empty point queries never scan the board.
+        """
+        self.empty_points = where1d(self.board == EMPTY).astype(np.int32)
+        self.num_empty = len(self.empty_points)
+        self.empty_index = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        self.empty_index[self.empty_points] = np.arange(self.num_empty, 
+                                                        dtype = np.int32)
+
+    def _add_empty(self, point):
+        """ point became empty: append it to the empty point index """
+        self.empty_points[self.num_empty] = point
+        self.empty_index[point] = self.num_empty
+        self.num_empty += 1
+
+    def _remove_empty(self, point):
+        """ point became occupied: swap-remove it from the empty point index """
+        i = self.empty_index[point]
+        self.num_empty -= 1
+        last = self.empty_points[self.num_empty]
+        self.empty_points[i] = last
+        self.empty_index[last] = i
+
+    def _initialize_line_codes(self):
         """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
+        Set up the line window codes of the empty board, see WINDOW_RADIUS.
+        """
+        self.window_index, self.window_value, empty_codes = \
+            line_window_tables(self.size)
+        self.line_codes = np.copy(empty_codes)
+
+    def point_line_codes(self, point):
         """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
+        Line window codes of point in the 4 directions: horizontal,
+        vertical, y=x and y=-x. The cell of point itself is cleared.
         """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
-        
+        codes = self.line_codes[point::self.maxpoint].tolist()
+        return [code & ~CENTER_MASK for code in codes]
+
+    def _update_line_codes(self, point, delta):
+        """ Add delta times the cell value of point to all windows holding it """
+        self.line_codes[self.window_index[point]] += \
+            delta * self.window_value[point]
+
+    def _place_stone(self, point, color):
+        """ Put a stone on the empty point and update the derived state """
+        self.board[point] = color
+        self._remove_empty(point)
+        self._update_line_codes(point, color)
+        self.position_code ^= self.zobrist[point][color]
+
+    def _remove_stone(self, point):
+        """ Remove the stone on point and update the derived state """
+        color = self.board[point]
+        self.board[point] = EMPTY
+        self._add_empty(point)
+        self._update_line_codes(point, -color)
+        self.position_code ^= self.zobrist[point][color]
+
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -242,7 +490,8 @@ class SimpleGoBoard(object):
         if self._has_liberty(opp_block):
             return None
         captures = list(where1d(opp_block))
-        self.board[captures] = EMPTY
+        for stone in captures:
+            self._remove_stone(stone)
         self.liberty_of[captures] = NULLPOINT
         single_capture = None 
         if len(captures) == 1:
@@ -268,7 +517,7 @@ class SimpleGoBoard(object):
         # General case: deal with captures, suicide, and next ko point
         opp_color = GoBoardUtil.opponent(color)
         in_enemy_eye = self._is_surrounded(point, opp_color)
-        self.board[point] = color
+        self._place_stone(point, color)
         single_captures = []
         neighbors = self.neighbors[point]
         for nb in neighbors:
@@ -280,7 +529,7 @@ class SimpleGoBoard(object):
             # check suicide of whole block
             block = self._block_of(point)
             if not self._has_liberty(block): # undo suicide move
-                self.board[point] = EMPTY
+                self._remove_stone(point)
                 return False
         self.ko_recapture = None
         if in_enemy_eye and len(single_captures) == 1:
@@ -305,14 +554,11 @@ class SimpleGoBoard(object):
         
     def _neighbors(self, point):
         """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+        return self.geometry.all_neighbors[point]
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
     
     def _point_to_coord(self, point):
         """
@@ -347,7 +593,11 @@ class SimpleGoBoard(object):
         assert point != PASS
         if self.board[point] != EMPTY:
             return False
-        self.board[point] = color
+        self._place_stone(point, color)
+        # only the lines through the new stone can make a new five
+        if self.winner is None and self.point_check_game_end_gomoku(point):
+            self.winner = color
+            self.winning_move = point
         self.current_player = GoBoardUtil.opponent(color)
         return True
         
@@ -409,18 +659,13 @@ class SimpleGoBoard(object):
         """
             Check if the game ends for the game of Gomoku.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
+        return self.winner is not None, self.winner
 
-        return False, None
+    def is_terminal(self):
+        """
+            The game is over: someone made five in a row or the board is full.
+            """
+        return self.winner is not None or self.num_empty == 0
 
     def solve(self):
         result, move, drawMove = alphabeta.solve(self)
@@ -443,102 +688,53 @@ class SimpleGoBoard(object):
     def policy_type_search_move(self, move):
         # Should figure out the order!!!
         color = self.current_player
-        if self.try_to_play_immediate_win(color, move):
-            return 40
-        elif self.try_to_block_oppoent_immediate_win(color, move):
-            return 30
-        elif self.win_in_2_move(color, move):
-            return 20
-        elif self.block_open_four(color, move):
-            return 10
+        codes = self.point_line_codes(move)
+        for value, _ in POLICY_PATTERNS:
+            if match_codes(POLICY_TABLES[color][value], codes) is not None:
+                return value
         return 0
     
+    def policy_priors(self, moves):
+        """
+        policy_type_search_move of each point of the numpy array moves,
+        computed together.
+        """
+        codes = self.line_codes.reshape(4, self.maxpoint)[:, moves]
+        return policy_values(codes & ~CENTER_MASK, self.current_player)
+
     def try_to_block_oppoent_immediate_win(self, color, point):
-        # xoooo.
-        # ooo.o
-        # oo.oo
-        patterns = {'.xxxx' : 0, 'x.xxx' : 1, 'xx.xx' : 2}
-        for pattern in patterns.keys():
-            for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                isFound= self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                if isFound:
-                    return True
-        return False
+        return self.match_policy(BLOCK_IMMEDIATE_WIN, color, point)
 
     def try_to_play_immediate_win(self, color, point):
-        # xxxx.
-        # xxx.x
-        # xx.xx
-        # xxx.xxx
-        patterns = {'.oooo' : 0, 'o.ooo' : 1, 'oo.oo' : 2}
-        for pattern in patterns.keys():
-            for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                isFound = self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                if isFound:
-                    return True
-        return False
+        return self.match_policy(IMMEDIATE_WIN, color, point)
     
     def win_in_2_move(self, color, point):
-        patterns = {'-.ooo-' : 1, '-o.oo-' : 2, 'o-o.o-o': 3}
-        for pattern in patterns.keys():
-            for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                isFound = self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                if isFound:
-                    return True
-        return False
+        return self.match_policy(WIN_IN_2, color, point)
 
     def block_open_four(self, color, point):
-        patterns = {'.x-xx-' : 0,  
-                    '-x.xx-' : 2, 
-                    '.xx-x-': 0,
-                    '.-xxx-?' : 0, '-.xxx-?' : 1, '?.xxx--' : 1, 
-                    '-.xxx--': 1, 'x-x.x-x': 3}
-        for pattern in patterns.keys():
-            for shift in [1, -1, self.NS, -self.NS, self.NS + 1, - self.NS - 1, self.NS - 1, - self.NS + 1]:
-                isFound = self.check_pattern(pattern, point, color, shift, patterns[pattern])
-                if isFound:
-                    return True
-        return False
+        return self.match_policy(BLOCK_OPEN_FOUR, color, point)
 
-    def check_pattern(self, pattern, start_point, color, shift, start_index):
-        opponent = GoBoardUtil.opponent(color)
-        front = start_index
-        d = shift
-        p = start_point
-        for i in range(front):
-            p -= d
-            if not (0 <= p < len(self.board)):
-                return False
-            c = pattern[front - i - 1]
-            b = self.board[p]
-            if c == "x" and b == opponent:
-                continue
-            elif c == "o" and b == color:
-                continue
-            elif c == "-" and b == EMPTY:
-                continue
-            elif c == "?" and (b == color or b == BORDER):
-                continue 
-            else:
-                return False
-        p = start_point
-        for i in range(start_index + 1, len(pattern)):
-            p += d
-            if not (0 <= p < len(self.board)):
-                return False
-            c = pattern[i]
-            b = self.board[p]
-            if c == "x" and b == opponent:
-                continue
-            elif c == "o" and b == color:
-                continue
-            elif c == "-" and b == EMPTY:
-                continue
-            elif c == "?" and (b == color or b == BORDER):
-                continue
-            else:
-                return False  
-
-        return True
+    def match_policy(self, value, color, point):
+        """
+        Check whether a pattern of the policy class value
+        matches a line through point
+        """
+        codes = self.point_line_codes(point)
+        return match_codes(POLICY_TABLES[color][value], codes) is not None
 
-    
+    def check_pattern(self, pattern, start_point, color, shift, start_index):
+        """
+        Check whether pattern matches the line through start_point
+        in direction shift, with start_point at pattern[start_index].
+        """
+        if shift < 0:
+            pattern = pattern[::-1]
+            start_index = len(pattern) - 1 - start_index
+            shift = -shift
+        key = (pattern, start_index, color)
+        if key not in _check_pattern_tables:
+            _check_pattern_tables[key] = compile_patterns(
+                {pattern: start_index}, color, POLICY_ALPHABET, mirror = False)
+        shifts = [1, self.NS, self.NS + 1, self.NS - 1]
+        code = self.point_line_codes(start_point)[shifts.index(shift)]
+        return match_codes(_check_pattern_tables[key], [code]) is not None
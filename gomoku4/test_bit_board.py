@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import random
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, BORDER, PASS
+from simple_board import SimpleGoBoard
+from bit_board import BitGoBoard
+
+class BitGoBoardTestCase(unittest.TestCase):
+    """Tests for bit_board.py, against simple_board.py"""
+
+    def assert_same_position(self, bitboard, goboard):
+        self.assertEqual(list(bitboard.board), list(goboard.board))
+        self.assertEqual(sorted(bitboard.get_empty_points()),
+                         sorted(goboard.get_empty_points()))
+        self.assertEqual(bitboard.num_empty_points(),
+                         goboard.num_empty_points())
+        self.assertEqual(bitboard.winner, goboard.winner)
+        self.assertEqual(bitboard.current_player, goboard.current_player)
+
+    def test_size_7(self):
+        bitboard = BitGoBoard(7)
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(bitboard.maxpoint, goboard.maxpoint)
+        self.assert_same_position(bitboard, goboard)
+        self.assertEqual(bitboard.get_color(0), BORDER)
+        self.assertEqual(bitboard.get_color(bitboard.pt(1,1)), EMPTY)
+
+    def test_five_in_all_directions(self):
+        for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            bitboard = BitGoBoard(7)
+            for i in range(5):
+                point = bitboard.pt(2 + dr * i, 4 + dc * (i - 2))
+                self.assertEqual(bitboard.winner, None)
+                self.assertTrue(bitboard.play_move_gomoku(point, WHITE))
+            self.assertEqual(bitboard.winner, WHITE)
+            self.assertTrue(bitboard.is_terminal())
+
+    def test_no_wrap_across_rows(self):
+        bitboard = BitGoBoard(7)
+        for col in [5, 6, 7]:
+            bitboard.play_move_gomoku(bitboard.pt(3, col), BLACK)
+        for col in [1, 2]:
+            bitboard.play_move_gomoku(bitboard.pt(4, col), BLACK)
+        self.assertEqual(bitboard.winner, None)
+
+    def test_is_legal_returns_bool(self):
+        bitboard = BitGoBoard(7)
+        point = bitboard.pt(4,4)
+        self.assertIs(bitboard.is_legal_gomoku(point, BLACK), True)
+        bitboard.play_move_gomoku(point, BLACK)
+        self.assertIs(bitboard.is_legal_gomoku(point, WHITE), False)
+        self.assertIs(bitboard.is_legal_gomoku(0, WHITE), False)
+        self.assertIs(bitboard.is_legal_gomoku(PASS, WHITE), False)
+
+    def test_random_games_match_simple_board(self):
+        random.seed(496)
+        for _ in range(20):
+            bitboard = BitGoBoard(7)
+            goboard = SimpleGoBoard(7)
+            moves = []
+            while not goboard.is_terminal():
+                move = random.choice(list(goboard.get_empty_points()))
+                color = goboard.current_player
+                self.assertTrue(bitboard.is_legal_gomoku(move, color))
+                self.assertEqual(bitboard.policy_type_search_move(move),
+                                 goboard.policy_type_search_move(move))
+                empty = goboard.get_empty_points()
+                self.assertEqual(list(bitboard.policy_priors(empty)),
+                                 list(goboard.policy_priors(empty)))
+                bitboard.play_move_gomoku(move, color)
+                goboard.play_move_gomoku(move, color)
+                self.assertFalse(bitboard.is_legal_gomoku(move, color))
+                moves.append(move)
+                self.assert_same_position(bitboard, goboard)
+            board_copy = bitboard.copy()
+            for move in moves[::-1]:
+                bitboard.undo_move(move)
+                goboard.undo_move(move)
+                self.assert_same_position(bitboard, goboard)
+            self.assertEqual(board_copy.num_empty_points(),
+                             49 - len(moves))
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import io
+import signal
+from unittest import mock
+from board_util import BLACK, EMPTY
+from simple_board import SimpleGoBoard
+from gtp_connection import GtpConnection
+from Gomoku4 import Gomoku4
+from mcts import ROOT
+
+class GtpConnectionTestCase(unittest.TestCase):
+    """Tests for gtp_connection.py"""
+
+    def run_commands(self, con, commands):
+        out = io.StringIO()
+        with mock.patch('gtp_connection.stdout', out):
+            for command in commands:
+                con.get_cmd(command)
+        return [line for line in out.getvalue().split('\n') if line]
+
+    def test_genmove_after_solve(self):
+        # solve sets an alarm of timelimit - 1 seconds, which must not
+        # go off during the search of the next genmove
+        con = GtpConnection(Gomoku4(), SimpleGoBoard(7))
+        try:
+            self.run_commands(con, ['boardsize 7', 'timelimit 2', 'solve'])
+            self.assertEqual(signal.alarm(0), 0)
+            board = con.board
+            responses = self.run_commands(con, ['genmove b'])
+            self.assertIs(con.board, board)
+            self.assertEqual(len(responses), 1)
+            self.assertRegex(responses[0], '^= [A-G][1-7]$')
+            self.assertEqual(con.board.num_empty_points(), 48)
+            self.assertEqual(list(con.board.board).count(BLACK), 1)
+        finally:
+            signal.alarm(0)
+            con.go_engine.stop_pondering()
+
+    def test_genmove_fallback_resets_engine(self):
+        con = GtpConnection(Gomoku4(n_simualtions_per_move=100),
+                            SimpleGoBoard(7))
+        self.run_commands(con, ['genmove b'])
+        self.assertGreater(con.go_engine.MCTS.tree.visits[ROOT], 0)
+        with mock.patch.object(con.go_engine.MCTS, 'get_move',
+                               side_effect=RuntimeError), \
+             mock.patch('sys.stderr', io.StringIO()):
+            responses = self.run_commands(con, ['genmove w'])
+        self.assertRegex(responses[0], '^= [A-G][1-7]$')
+        self.assertEqual(con.board.num_empty_points(), 47)
+        # the random move is not in the tree, which starts over
+        self.assertEqual(con.go_engine.MCTS.tree.visits[ROOT], 0)
+        self.assertEqual(con.go_engine.MCTS.tree.num_nodes, 1)
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
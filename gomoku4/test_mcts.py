@@ -0,0 +1,581 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import os
+import random
+import tempfile
+import time
+import threading
+from unittest import mock
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY
+from simple_board import SimpleGoBoard
+from mcts import MCTS, Tree, ROOT, NO_NODE, PriorCache, batch_rollout, \
+                 ranked_moves, virtual_loss, EARLY_STOP_INTERVAL, \
+                 _worker_search
+
+class TreeTestCase(unittest.TestCase):
+    """Tests for the array tree of mcts.py"""
+
+    def assert_consistent(self, tree):
+        """ Every node but the root is reached by one edge, edge blocks
+        do not overlap """
+        seen = {ROOT}
+        edges = set()
+        for node in range(tree.num_nodes):
+            for edge in tree.edges(node):
+                self.assertNotIn(edge, edges)
+                edges.add(edge)
+                child = tree.child[edge]
+                if child != NO_NODE:
+                    self.assertNotIn(child, seen)
+                    seen.add(child)
+        self.assertEqual(len(seen), tree.num_nodes)
+        self.assertEqual(len(edges), tree.edges_used)
+
+    def test_expand_and_grow(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree(capacity=16)
+        tree.expand(ROOT, goboard)
+        self.assertEqual(tree.num_nodes, 1)
+        self.assertEqual(tree.edges_used, 49)
+        self.assertGreaterEqual(tree.edge_capacity, 49)
+        self.assertEqual(sorted(tree.move[edge] for edge in
+                                tree.edges(ROOT)),
+                         sorted(goboard.get_empty_points()))
+        edge = tree.find_edge(ROOT, goboard.pt(4,4))
+        self.assertEqual(tree.move[edge], goboard.pt(4,4))
+        self.assertEqual(tree.find_child(ROOT, goboard.pt(4,4)), NO_NODE)
+        for e in tree.edges(ROOT):
+            goboard.make(tree.move[e])
+            tree.child_node(e, goboard)
+            goboard.unmake()
+        self.assertEqual(tree.num_nodes, 50)
+        self.assertGreaterEqual(tree.capacity, 50)
+        child = tree.find_child(ROOT, goboard.pt(4,4))
+        goboard.make(goboard.pt(4,4))
+        self.assertEqual(tree.child_node(edge, goboard), child)
+        tree.expand(child, goboard)
+        self.assertEqual(tree.num_nodes, 50)
+        self.assertEqual(tree.edges_used, 97)
+        self.assert_consistent(tree)
+
+    def test_update_path(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree()
+        tree.expand(ROOT, goboard)
+        child = child_node(tree, ROOT, goboard, goboard.pt(1,1))
+        tree.update_path([ROOT, child], 1)
+        tree.update_path([ROOT], 0)
+        self.assertEqual(tree.visits[ROOT], 2)
+        self.assertEqual(tree.black_wins[ROOT], 1)
+        self.assertEqual(tree.visits[child], 1)
+        self.assertEqual(tree.black_wins[child], 1)
+        visits, black_wins = tree.child_stats(ROOT)
+        edge = tree.find_edge(ROOT, goboard.pt(1,1)) - tree.first_edge[ROOT]
+        self.assertEqual(visits.sum(), 1)
+        self.assertEqual((visits[edge], black_wins[edge]), (1, 1))
+
+    def test_update_amaf(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree()
+        tree.expand(ROOT, goboard)
+        child = child_node(tree, ROOT, goboard, goboard.pt(4,4))
+        goboard.make(goboard.pt(4,4))
+        tree.expand(child, goboard)
+        # black played 4,4 then 1,1, white played 2,2, white won
+        final_board = goboard.board.copy()
+        final_board[goboard.pt(1,1)] = BLACK
+        final_board[goboard.pt(2,2)] = WHITE
+        tree.update_amaf([ROOT, child], BLACK, final_board, 0)
+        for node, move, amaf in [(ROOT, (4,4), 1), (ROOT, (1,1), 1),
+                                 (ROOT, (2,2), 0), (child, (2,2), 1),
+                                 (child, (1,1), 0)]:
+            found = tree.find_edge(node, goboard.pt(*move))
+            self.assertEqual(tree.amaf_visits[found], amaf)
+            self.assertEqual(tree.amaf_black_wins[found], 0)
+        self.assertEqual(tree.amaf_visits[tree.edges(ROOT)].sum(), 2)
+        self.assertEqual(tree.amaf_visits[tree.edges(child)].sum(), 1)
+        # a move with only all-moves-as-first statistics is not infinite,
+        # a move with no statistics is
+        values = tree.uct_values(ROOT, 0.4, True, 300)
+        first = tree.first_edge[ROOT]
+        self.assertEqual(values[tree.find_edge(ROOT, goboard.pt(4,4))
+                                - first], 0)
+        self.assertEqual(values[tree.find_edge(ROOT, goboard.pt(7,7))
+                                - first], np.inf)
+
+    def test_widen(self):
+        goboard = SimpleGoBoard(7)
+        for col in [3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+        goboard.play_move_gomoku(goboard.pt(1, 1), WHITE)
+        tree = Tree()
+        tree.expand(ROOT, goboard, 2)
+        self.assertEqual(tree.num_edges[ROOT], 2)
+        # black to play, the open four moves have the highest prior
+        self.assertEqual(sorted(tree.move[edge] for edge in
+                                tree.edges(ROOT)),
+                         [goboard.pt(4,2), goboard.pt(4,6)])
+        edge = tree.first_edge[ROOT]
+        move = tree.move[edge]
+        child = child_node(tree, ROOT, goboard, move)
+        goboard.make(move)
+        tree.expand(child, goboard, 1)
+        goboard.unmake()
+        tree.visits[child] = 3
+        tree.widen(ROOT, goboard, 3)
+        self.assertEqual(tree.num_edges[ROOT], 4)
+        self.assertNotEqual(tree.first_edge[ROOT], edge)
+        self.assertEqual(tree.find_child(ROOT, move), child)
+        self.assertEqual(tree.child_stats(ROOT)[0][0], 3)
+        priors = [tree.prior[edge] for edge in tree.edges(ROOT)]
+        self.assertEqual(priors, sorted(priors, reverse = True))
+        tree.widen(ROOT, goboard)
+        self.assertEqual(tree.num_edges[ROOT], 45)
+        tree.compact(ROOT)
+        self.assertEqual(tree.num_nodes, 2)
+        self.assertEqual(tree.edges_used, 46)
+        self.assert_consistent(tree)
+
+    def test_transpositions(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree(transpositions = True)
+        a, b, c = goboard.pt(1,1), goboard.pt(2,2), goboard.pt(3,3)
+        nodes = []
+        for moves in [(a, b, c), (c, b, a), (c, goboard.pt(4,4))]:
+            node = ROOT
+            for move in moves:
+                if not tree.expanded[node]:
+                    tree.expand(node, goboard)
+                node = child_node(tree, node, goboard, move)
+                goboard.make(move)
+            nodes.append(node)
+            goboard.unmake_to(0)
+        # a, b, c and c, b, a reach the same position, c only one
+        self.assertEqual(nodes[0], nodes[1])
+        self.assertEqual(tree.num_nodes, 7)
+        self.assertEqual(len(tree.table), 6)
+        # after c, the position of c, b, a is still shared
+        tree.compact(tree.find_child(ROOT, c))
+        self.assertEqual(tree.num_nodes, 4)
+        self.assertEqual(sorted(tree.table.values()), [0, 1, 2, 3])
+        goboard.make(c)
+        self.assertEqual(tree.table[(goboard.code(), goboard.current_player)],
+                         ROOT)
+        self.assert_consistent(tree)
+
+    def test_prune(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree()
+        tree.expand(ROOT, goboard)
+        a, b = goboard.pt(1,1), goboard.pt(4,4)
+        nodes = {}
+        for move, visits in [(a, 5), (b, 3), (goboard.pt(7,7), 1)]:
+            nodes[move] = child_node(tree, ROOT, goboard, move)
+            tree.visits[nodes[move]] = visits
+        goboard.make(a)
+        tree.expand(nodes[a], goboard)
+        grandchild = child_node(tree, nodes[a], goboard, b)
+        tree.visits[grandchild] = 2
+        goboard.unmake()
+        tree.visits[ROOT] = 9
+        tree.prune(3)
+        self.assertEqual(tree.num_nodes, 3)
+        self.assertEqual(tree.prunes, 1)
+        self.assertEqual(tree.visits[tree.find_child(ROOT, a)], 5)
+        self.assertEqual(tree.visits[tree.find_child(ROOT, b)], 3)
+        self.assertEqual(tree.find_child(ROOT, goboard.pt(7,7)), NO_NODE)
+        # the edges of a stay, without their node
+        self.assertEqual(tree.find_child(tree.find_child(ROOT, a), b),
+                         NO_NODE)
+        self.assertEqual(tree.edges_used, 49 + 48)
+        self.assert_consistent(tree)
+
+    def test_prune_transpositions(self):
+        goboard = SimpleGoBoard(7)
+        tree = Tree(transpositions = True)
+        a, b, c, d = goboard.pt(1,1), goboard.pt(2,2), goboard.pt(3,3), \
+                     goboard.pt(4,4)
+        for moves, visits in [((a, b, c), (3, 2, 10)),
+                              ((c, b, a), (5, 2, 10)), ((c, d), (5, 4))]:
+            node = ROOT
+            for move, n in zip(moves, visits):
+                if not tree.expanded[node]:
+                    tree.expand(node, goboard)
+                node = child_node(tree, node, goboard, move)
+                tree.visits[node] = n
+                goboard.make(move)
+            goboard.unmake_to(0)
+        tree.visits[ROOT] = 20
+        # the shared node has more visits than both of its parents, which
+        # are pruned, so it is dropped with them
+        tree.prune(4)
+        self.assertEqual(tree.num_nodes, 3)
+        self.assertEqual(tree.visits[tree.find_child(ROOT, c)], 5)
+        self.assertEqual(tree.find_child(ROOT, a), NO_NODE)
+        self.assertEqual(sorted(tree.table.values()), [1, 2])
+        self.assert_consistent(tree)
+
+    def test_prior_cache(self):
+        goboard = SimpleGoBoard(7)
+        cache = PriorCache(capacity = 2)
+        moves, priors = cache.ranked_moves(goboard)
+        self.assertEqual(list(moves), list(ranked_moves(goboard)[0]))
+        self.assertIs(cache.ranked_moves(goboard)[0], moves)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertFalse(moves.flags.writeable)
+        goboard.make(goboard.pt(4,4))
+        cache.ranked_moves(goboard)
+        goboard.unmake()
+        # the same stones with the other player to move
+        goboard.current_player = WHITE
+        cache.ranked_moves(goboard)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        # the first position was the least recently used
+        goboard.current_player = BLACK
+        self.assertIsNot(cache.ranked_moves(goboard)[0], moves)
+        self.assertEqual(len(cache.entries), 2)
+        tree = Tree(prior_cache = cache)
+        tree.expand(ROOT, goboard)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_compact_keeps_subtree(self):
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        mcts.exploration = 0.4
+        for _ in range(200):
+            mcts._playout(goboard, BLACK)
+        tree = mcts.tree
+        move = goboard.pt(4,4)
+        child = tree.find_child(ROOT, move)
+        subtree = subtree_stats(tree, child)
+        mcts.update_with_move(move)
+        self.assertEqual(mcts.toplay, WHITE)
+        self.assertEqual(subtree_stats(tree, ROOT), subtree)
+        self.assertEqual(tree.num_nodes, len(subtree))
+        self.assert_consistent(tree)
+        mcts.update_with_move(NO_NODE)
+        self.assertEqual(tree.num_nodes, 1)
+
+    def test_update_with_opponent_move(self):
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, 200, 0.4)
+        mcts.update_with_move(move)
+        visits, _ = mcts.tree.child_stats(ROOT)
+        reply = mcts.tree.move[mcts.tree.first_edge[ROOT] + np.argmax(visits)]
+        subtree = subtree_stats(mcts.tree, mcts.tree.find_child(ROOT, reply))
+        mcts.update_with_move(reply, WHITE)
+        self.assertEqual(mcts.toplay, BLACK)
+        self.assertEqual(subtree_stats(mcts.tree, ROOT), subtree)
+        # a move by the player who is not to play drops the tree
+        mcts.update_with_move(goboard.pt(1,1), WHITE)
+        self.assertEqual(mcts.tree.num_nodes, 1)
+        self.assertEqual(mcts.toplay, BLACK)
+
+    def test_get_move_for_player_not_to_move(self):
+        # clear_board; genmove w
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        start = list(goboard.board)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, WHITE, 50, 0.4, early_stop=False)
+        self.assertEqual(mcts.tree.visits[ROOT], 50)
+        self.assertTrue(goboard.is_legal_gomoku(move, WHITE))
+        self.assertEqual(goboard.current_player, BLACK)
+        self.assertEqual(list(goboard.board), start)
+        # the moves of the tree are white's
+        goboard.current_player = WHITE
+        goboard.make(move)
+        self.assertEqual(goboard.get_color(move), WHITE)
+
+    def test_get_move(self):
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(3, col), WHITE)
+        start = list(goboard.board)
+        move = MCTS().get_move(goboard, BLACK, 100, 0.4)
+        self.assertEqual(move, goboard.pt(1, 5))
+        self.assertEqual(list(goboard.board), start)
+
+    def test_root_parallel_merges_workers(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, WHITE, 30, 0.4, n_workers=3)
+        tree = mcts.tree
+        visits, _ = tree.child_stats(ROOT)
+        self.assertEqual(tree.visits[ROOT], 90)
+        self.assertEqual(visits.sum(), 90)
+        best = tree.find_child(ROOT, move)
+        self.assertEqual(tree.visits[best], visits.max())
+
+    def test_root_parallel_jobs_copy_board(self):
+        # the pool pickles the jobs on a thread while this process makes
+        # and unmakes moves on the board, so each job has its own copy
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        code = goboard.code()
+        jobs = []
+
+        class Result(object):
+            def get(self):
+                return [_worker_search(job) for job in jobs]
+
+        class Pool(object):
+            def __init__(self, processes):
+                pass
+            def __enter__(self):
+                return self
+            def __exit__(self, *args):
+                return False
+            def map_async(self, func, iterable):
+                jobs.extend(iterable)
+                return Result()
+
+        with mock.patch('multiprocessing.Pool', Pool):
+            MCTS().get_move(goboard, WHITE, 20, 0.4, n_workers=3)
+        self.assertEqual(len(jobs), 2)
+        for job in jobs:
+            self.assertIsNot(job[0], goboard)
+            self.assertEqual(job[0].code(), code)
+        self.assertIsNot(jobs[0][0], jobs[1][0])
+
+    def test_deadline(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        mcts.exploration = 0.4
+        # a deadline in the past still gets one playout
+        self.assertEqual(mcts._search(goboard, BLACK, None,
+                                      deadline=time.monotonic()), 1)
+        start = time.monotonic()
+        done = mcts._search(goboard, BLACK, None, deadline=start + 0.2)
+        self.assertGreater(done, 1)
+        self.assertGreaterEqual(time.monotonic(), start + 0.2)
+        self.assertEqual(mcts.tree.visits[ROOT], done + 1)
+        move = mcts.get_move(goboard, BLACK, None, 0.4,
+                             deadline=time.monotonic() + 0.1)
+        self.assertTrue(goboard.is_legal_gomoku(move, BLACK))
+
+    def test_early_stop(self):
+        random.seed(496)
+        np.random.seed(496)
+        # white has to block the four of black at 4,5
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            if col < 4:
+                goboard.play_move_gomoku(goboard.pt(6, 2 * col - 1), WHITE)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, WHITE, 2000, 0.4)
+        self.assertEqual(move, goboard.pt(4, 5))
+        done = mcts.tree.visits[ROOT]
+        self.assertLess(done, 2000)
+        self.assertEqual(done % EARLY_STOP_INTERVAL, 0)
+        self.assertEqual(mcts.saved, 2000 - done)
+        visits = np.sort(mcts.tree.child_stats(ROOT)[0])
+        self.assertGreater(visits[-1] - visits[-2], mcts.saved)
+        mcts = MCTS()
+        mcts.get_move(goboard, WHITE, 200, 0.4, early_stop=False)
+        self.assertEqual(mcts.tree.visits[ROOT], 200)
+        self.assertEqual(mcts.saved, 0)
+
+    def test_max_nodes(self):
+        random.seed(496)
+        np.random.seed(496)
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS(max_nodes = 100)
+        mcts.exploration = 0.4
+        mcts._search(goboard, BLACK, 500)
+        tree = mcts.tree
+        self.assertLessEqual(tree.num_nodes, 100)
+        self.assertGreater(tree.prunes, 0)
+        self.assertEqual(tree.visits[ROOT], 500)
+        self.assertEqual(len(live_nodes(tree)), tree.num_nodes)
+
+    def test_solver_proves_win(self):
+        random.seed(496)
+        np.random.seed(496)
+        # black to play makes an open four at 4,5 or 4,1
+        goboard = SimpleGoBoard(7)
+        for col in range(2, 5):
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(7, 2 * col - 3), WHITE)
+        mcts = MCTS(widening = False)
+        move = mcts.get_move(goboard, BLACK, 1000, 0.4)
+        tree = mcts.tree
+        self.assertEqual(tree.proven[ROOT], BLACK)
+        self.assertIn(move, [goboard.pt(4, 5), goboard.pt(4, 1)])
+        self.assertEqual(tree.proven[tree.find_child(ROOT, move)], BLACK)
+        self.assertEqual(tree.visits[ROOT], EARLY_STOP_INTERVAL)
+
+    def test_solver_proves_loss(self):
+        random.seed(496)
+        np.random.seed(496)
+        # white to play cannot block both ends of the open four of black
+        goboard = SimpleGoBoard(7)
+        for col in range(2, 6):
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            if col < 5:
+                goboard.play_move_gomoku(goboard.pt(7, 2 * col - 3), WHITE)
+        mcts = MCTS(widening = False)
+        mcts.exploration = 0.4
+        mcts._search(goboard, WHITE, 200)
+        tree = mcts.tree
+        self.assertEqual(tree.proven[ROOT], BLACK)
+        proven = tree.child_proven(ROOT)
+        self.assertEqual(len(proven), goboard.num_empty_points())
+        self.assertTrue((proven == BLACK).all())
+        # once proven, the tree does not grow
+        visits = tree.visits[ROOT]
+        num_nodes = tree.num_nodes
+        mcts._search(goboard, WHITE, 10)
+        self.assertEqual(tree.visits[ROOT], visits + 10)
+        self.assertEqual(tree.num_nodes, num_nodes)
+
+    def test_snapshot(self):
+        random.seed(496)
+        np.random.seed(496)
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        mcts.get_move(goboard, BLACK, 300, 0.4, early_stop=False)
+        stats = subtree_stats(mcts.tree, ROOT)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'tree')
+            self.assertEqual(mcts.save(filename, goboard), len(stats))
+            loaded = MCTS()
+            self.assertEqual(loaded.load(filename, goboard), len(stats))
+            self.assertEqual(subtree_stats(loaded.tree, ROOT), stats)
+            self.assertEqual(loaded.toplay, BLACK)
+            # the search goes on from the snapshot, the file stays
+            loaded.get_move(goboard, BLACK, 100, 0.4, early_stop=False)
+            self.assertEqual(loaded.tree.visits[ROOT], 400)
+            self.assertGreater(loaded.tree.num_nodes, len(stats))
+            again = MCTS()
+            again.load(filename, goboard)
+            self.assertEqual(subtree_stats(again.tree, ROOT), stats)
+            # only the first ply, the root and its children
+            num_nodes = mcts.save(filename, goboard, 1)
+            self.assertEqual(num_nodes, 1 + len([moves for moves in stats
+                                                 if len(moves) == 1]))
+            again.load(filename, goboard)
+            self.assertEqual(subtree_stats(again.tree, ROOT),
+                             {moves: value for moves, value in stats.items()
+                              if len(moves) <= 1})
+            self.assertEqual(again.tree.edges_used,
+                             again.tree.num_edges[:num_nodes].sum())
+            # other board sizes and positions are refused
+            with self.assertRaises(ValueError):
+                again.load(filename, SimpleGoBoard(9))
+            goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+            with self.assertRaises(ValueError):
+                again.load(filename, goboard)
+            with open(filename, 'wb') as f:
+                f.write(b'not a tree')
+            with self.assertRaises(ValueError):
+                again.load(filename, SimpleGoBoard(7))
+
+    def test_ponder_until_stopped(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, 20, 0.4)
+        mcts.update_with_move(move)
+        goboard.play_move_gomoku(move, BLACK)
+        visits = mcts.tree.visits[ROOT]
+        stop = threading.Event()
+        thread = threading.Thread(target=mcts.ponder,
+                                  args=(goboard.copy(), 0.4, stop))
+        thread.start()
+        time.sleep(0.2)
+        stop.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertGreater(mcts.tree.visits[ROOT], visits)
+        self.assertEqual(mcts.toplay, WHITE)
+        reply = goboard.pt(1,1)
+        child = mcts.tree.find_child(ROOT, reply)
+        subtree = subtree_stats(mcts.tree, child)
+        mcts.update_with_move(reply)
+        self.assertEqual(subtree_stats(mcts.tree, ROOT), subtree)
+
+    def test_batch_rollout(self):
+        # a full board without five in a row, except that row 1 has
+        # four black stones and one empty point
+        goboard = SimpleGoBoard(7)
+        for row in range(1, 8):
+            for col in range(1, 8):
+                color = BLACK if (row + 2 * col) % 4 < 2 else WHITE
+                if row == 1 and col <= 4:
+                    color = BLACK
+                if (row, col) != (1, 5):
+                    goboard.play_move_gomoku(goboard.pt(row, col), color)
+        self.assertEqual(goboard.winner, None)
+        cells = np.array([goboard.board] * 3, dtype = np.int8)
+        toplay = np.array([BLACK, WHITE, BLACK], dtype = np.int8)
+        winner = np.array([EMPTY, EMPTY, WHITE], dtype = np.int8)
+        result = batch_rollout(cells, toplay, winner, goboard.NS)
+        self.assertEqual(list(result), [BLACK, EMPTY, WHITE])
+        self.assertEqual(cells[0][goboard.pt(1,5)], BLACK)
+        self.assertEqual(cells[1][goboard.pt(1,5)], WHITE)
+        self.assertEqual(cells[2][goboard.pt(1,5)], EMPTY)
+
+    def test_virtual_loss(self):
+        self.assertEqual(list(virtual_loss(4, BLACK)), [0, 0, 1, 0])
+        self.assertEqual(list(virtual_loss(4, WHITE)), [0, 1, 0, 1])
+
+    def test_playout_batch(self):
+        np.random.seed(496)
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        start = list(goboard.board)
+        mcts = MCTS()
+        mcts.exploration = 0.4
+        self.assertEqual(mcts._search(goboard, WHITE, 50, batch_size=16), 50)
+        tree = mcts.tree
+        self.assertEqual(list(goboard.board), start)
+        self.assertEqual(tree.visits[ROOT], 50)
+        for node in live_nodes(tree):
+            self.assertLessEqual(tree.child_stats(node)[0].sum(),
+                                 tree.visits[node])
+            self.assertLessEqual(tree.black_wins[node], tree.visits[node])
+            self.assertGreaterEqual(tree.black_wins[node], 0)
+
+"""Utility"""
+def child_node(tree, node, goboard, move):
+    """ The node reached from node by move, created if needed """
+    goboard.make(move)
+    child = tree.child_node(tree.find_edge(node, move), goboard)
+    goboard.unmake()
+    return child
+
+def live_nodes(tree):
+    """ The nodes reachable from the root """
+    nodes = [ROOT]
+    for node in nodes:
+        nodes.extend(child for child in tree.child[tree.edges(node)]
+                     if child != NO_NODE and child not in nodes)
+    return nodes
+
+def subtree_stats(tree, node):
+    """ Visits and wins of the nodes below node, by move sequence """
+    stats = {}
+    stack = [(node, ())]
+    while stack:
+        node, moves = stack.pop()
+        stats[moves] = (tree.visits[node], tree.black_wins[node])
+        for edge in tree.edges(node):
+            if tree.child[edge] != NO_NODE:
+                stack.append((tree.child[edge],
+                              moves + (int(tree.move[edge]),)))
+    return stats
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
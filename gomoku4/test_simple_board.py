@@ -0,0 +1,357 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import random
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, BORDER, PASS, NULLPOINT, \
+                       where1d
+from simple_board import SimpleGoBoard, POLICY_PATTERNS
+from patterns import WINDOW_RADIUS
+
+class SimpleGoBoardTestCase(unittest.TestCase):
+    """Tests for simple_board.py"""
+
+    def assert_empty_index(self, goboard):
+        empty = sorted(goboard.get_empty_points())
+        self.assertEqual(empty, list(where1d(goboard.board == EMPTY)))
+        self.assertEqual(goboard.num_empty_points(), len(empty))
+        for i in range(goboard.num_empty):
+            point = goboard.empty_points[i]
+            self.assertEqual(goboard.empty_index[point], i)
+
+    def assert_same_state(self, goboard, other):
+        self.assertEqual(list(goboard.board), list(other.board))
+        self.assertEqual(goboard.current_player, other.current_player)
+        self.assertEqual(goboard.winner, other.winner)
+        self.assertEqual(goboard.code(), other.code())
+        self.assertEqual(sorted(goboard.get_empty_points()),
+                         sorted(other.get_empty_points()))
+        self.assert_empty_index(goboard)
+        self.assertEqual(list(goboard.line_codes), list(other.line_codes))
+
+    def test_size_7_empty_points(self):
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(goboard.num_empty_points(), 49)
+        self.assert_empty_index(goboard)
+
+    def test_empty_index_play_and_undo(self):
+        goboard = SimpleGoBoard(7)
+        moves = [goboard.pt(4,4), goboard.pt(1,1), goboard.pt(7,7),
+                 goboard.pt(4,5), goboard.pt(2,6)]
+        color = BLACK
+        for move in moves:
+            self.assertTrue(goboard.play_move_gomoku(move, color))
+            self.assertFalse(move in goboard.get_empty_points())
+            self.assert_empty_index(goboard)
+            color = WHITE + BLACK - color
+        self.assertEqual(goboard.num_empty_points(), 49 - len(moves))
+        for move in moves[::-1]:
+            goboard.undo_move(move)
+            self.assert_empty_index(goboard)
+        self.assertEqual(goboard.num_empty_points(), 49)
+        self.assertEqual(goboard.current_player, BLACK)
+
+    def test_empty_points_sorted(self):
+        # the swap-remove index is unordered, get_empty_points is not:
+        # genmove breaks ties between moves by its order
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        played = []
+        for _ in range(20):
+            move = random.choice(list(goboard.get_empty_points()))
+            goboard.play_move_gomoku(move, goboard.current_player)
+            played.append(move)
+            self.assertEqual(list(goboard.get_empty_points()),
+                             list(where1d(goboard.board == EMPTY)))
+        for move in played[::3]:
+            goboard.undo_move(move)
+        self.assertEqual(list(goboard.get_empty_points()),
+                         list(where1d(goboard.board == EMPTY)))
+
+    def test_empty_index_copy_and_reset(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(3,3), BLACK)
+        board_copy = goboard.copy()
+        board_copy.play_move_gomoku(goboard.pt(3,4), WHITE)
+        self.assertEqual(goboard.num_empty_points(), 48)
+        self.assertEqual(board_copy.num_empty_points(), 47)
+        self.assert_empty_index(goboard)
+        goboard.reset(5)
+        self.assertEqual(goboard.num_empty_points(), 25)
+        self.assert_empty_index(goboard)
+
+    def test_copy_shares_only_size_tables(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        board_copy = goboard.copy()
+        self.assertIs(board_copy.neighbors, goboard.neighbors)
+        self.assertIs(board_copy.window_index, goboard.window_index)
+        board_copy.play_move_gomoku(goboard.pt(4,5), WHITE)
+        board_copy.undo_move(goboard.pt(4,4))
+        self.assertEqual(goboard.get_color(goboard.pt(4,4)), BLACK)
+        self.assertEqual(goboard.get_color(goboard.pt(4,5)), EMPTY)
+        self.assertEqual(goboard.current_player, WHITE)
+        self.assert_empty_index(goboard)
+        self.assert_empty_index(board_copy)
+        self.assertEqual(list(goboard.line_codes), line_codes(goboard))
+
+    def test_geometry_shared_per_size(self):
+        goboard = SimpleGoBoard(7)
+        self.assertIs(SimpleGoBoard(7).geometry, goboard.geometry)
+        self.assertIsNot(SimpleGoBoard(5).geometry, goboard.geometry)
+        geometry = goboard.geometry
+        self.assertEqual(list(geometry.points),
+                         list(where1d(goboard.board == EMPTY)))
+        self.assertEqual(sorted(geometry.neighbors[goboard.pt(1,1)]),
+                         [goboard.pt(1,2), goboard.pt(2,1)])
+        self.assertEqual(len(geometry.neighbors8[goboard.pt(4,4)]), 8)
+        self.assertEqual(len(geometry.neighbors8[goboard.pt(7,7)]), 3)
+        # the board loops iterate plain lists of ints, not numpy views
+        self.assertIsInstance(geometry.neighbors[goboard.pt(4,4)], list)
+        self.assertIsInstance(geometry.lines[0][0][0], int)
+        for table in [geometry.neighbors, geometry.neighbors8] + \
+                     geometry.lines:
+            self.assertEqual(table.points.dtype, np.int32)
+            self.assertFalse(table.points.flags.writeable)
+        # off-array neighbors are NULLPOINT
+        self.assertEqual(geometry.all_neighbors[0][0], NULLPOINT)
+        self.assertEqual(geometry.point_names[goboard.pt(2,3)], 'C2')
+        # 7 rows, 7 columns and 13 lines in each diagonal direction
+        self.assertEqual([len(lines) for lines in geometry.lines],
+                         [7, 7, 13, 13])
+        for lines in geometry.lines:
+            self.assertEqual(sorted(np.concatenate(lines)),
+                             list(geometry.points))
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        self.assertEqual(geometry.empty_board[goboard.pt(4,4)], EMPTY)
+
+    def test_winner_tracking(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(2, col), WHITE)
+            self.assertEqual(goboard.winner, None)
+            self.assertFalse(goboard.is_terminal())
+        goboard.play_move_gomoku(goboard.pt(1, 5), BLACK)
+        self.assertEqual(goboard.winner, BLACK)
+        self.assertTrue(goboard.is_terminal())
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, BLACK))
+        # a later five does not change the result of the game
+        goboard.play_move_gomoku(goboard.pt(2, 5), WHITE)
+        self.assertEqual(goboard.winner, BLACK)
+        goboard.undo_move(goboard.pt(2, 5))
+        self.assertEqual(goboard.winner, BLACK)
+        goboard.undo_move(goboard.pt(1, 5))
+        self.assertEqual(goboard.winner, None)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+    def test_full_board_is_terminal(self):
+        goboard = SimpleGoBoard(2)
+        for point in goboard.get_empty_points():
+            self.assertFalse(goboard.is_terminal())
+            goboard.play_move_gomoku(point, goboard.current_player)
+        self.assertTrue(goboard.is_terminal())
+        self.assertEqual(goboard.winner, None)
+
+    def test_line_codes_play_and_undo(self):
+        goboard = SimpleGoBoard(7)
+        moves = [goboard.pt(4,4), goboard.pt(4,5), goboard.pt(1,7),
+                 goboard.pt(7,1), goboard.pt(5,5)]
+        for move in moves:
+            goboard.play_move_gomoku(move, goboard.current_player)
+            self.assertEqual(list(goboard.line_codes), line_codes(goboard))
+        board_copy = goboard.copy()
+        for move in moves[::-1]:
+            goboard.undo_move(move)
+            self.assertEqual(list(goboard.line_codes), line_codes(goboard))
+        self.assertEqual(list(board_copy.line_codes), line_codes(board_copy))
+
+    def test_make_unmake(self):
+        random.seed(496)
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4,4), BLACK)
+        start = goboard.copy()
+        positions = []
+        while not goboard.is_terminal():
+            positions.append(goboard.copy())
+            move = random.choice(list(goboard.get_empty_points()))
+            self.assertTrue(goboard.make(move))
+            self.assertEqual(goboard.code(), zobrist_code(goboard))
+        self.assertFalse(goboard.make(goboard.move_stack[0]))
+        self.assertEqual(goboard.num_moves, len(positions))
+        for position in positions[::-1]:
+            goboard.unmake()
+            self.assert_same_state(goboard, position)
+        goboard.make(goboard.pt(1,1))
+        goboard.make(goboard.pt(1,2))
+        goboard.unmake_to(0)
+        self.assert_same_state(goboard, start)
+
+    def test_policy_priors(self):
+        random.seed(496)
+        for _ in range(10):
+            goboard = SimpleGoBoard(7)
+            while not goboard.is_terminal():
+                empty = goboard.get_empty_points()
+                self.assertEqual(list(goboard.policy_priors(empty)),
+                                 [goboard.policy_type_search_move(move)
+                                  for move in empty.tolist()])
+                goboard.play_move_gomoku(random.choice(list(empty)),
+                                         goboard.current_player)
+
+    def test_check_pattern(self):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4]:
+            goboard.play_move_gomoku(goboard.pt(3, col), BLACK)
+        # the move at 3,5 makes an open four for black
+        self.assertTrue(goboard.check_pattern('-ooo.-', goboard.pt(3,5),
+                                              BLACK, 1, 4))
+        self.assertTrue(goboard.check_pattern('-.ooo-', goboard.pt(3,5),
+                                              BLACK, -1, 1))
+        self.assertFalse(goboard.check_pattern('-.ooo-', goboard.pt(3,5),
+                                               BLACK, 1, 1))
+        self.assertFalse(goboard.check_pattern('-ooo.-', goboard.pt(3,5),
+                                               WHITE, 1, 4))
+        # white to play, 3,5 blocks the open three
+        self.assertEqual(goboard.policy_type_search_move(goboard.pt(3,5)), 
+                         10)
+
+    def test_policy_fixed_positions(self):
+        # the policy value / 10 of each empty point, as given by the
+        # interpreted pattern matcher the policy tables replaced
+        for rows, toplay, values in POLICY_POSITIONS:
+            goboard = board_from_rows(rows, toplay)
+            for row in range(1, 8):
+                for col in range(1, 8):
+                    point = goboard.pt(row, col)
+                    if goboard.get_color(point) != EMPTY:
+                        continue
+                    self.assertEqual(
+                        goboard.policy_type_search_move(point),
+                        10 * int(values[row - 1][col - 1]), (rows, row, col))
+                    for _, patterns in POLICY_PATTERNS:
+                        for pattern, index in patterns.items():
+                            for shift in [1, -1, goboard.NS, -goboard.NS,
+                                          goboard.NS + 1, -goboard.NS - 1,
+                                          goboard.NS - 1, -goboard.NS + 1]:
+                                self.assertEqual(
+                                    goboard.check_pattern(pattern, point,
+                                        toplay, shift, index),
+                                    interpreted_check_pattern(goboard,
+                                        pattern, point, toplay, shift, index))
+
+"""
+Positions with X for black and O for white, row 1 first, the player to
+play, and the policy value / 10 of each empty point
+"""
+POLICY_POSITIONS = [
+    (["OO.OO..",
+      ".......",
+      "XX.XX..",
+      ".......",
+      "X.X.X.X",
+      ".......",
+      "O.X...."], BLACK,
+     ["..3..00", "0000000", "..4..00", "0000000", ".0.2.0.", "0000000",
+      ".0.0000"]),
+    (["..X....",
+      "..X....",
+      "..X....",
+      "..X....",
+      "O.O.O..",
+      "OOO.O..",
+      "......."], WHITE,
+     ["00.0000", "00.0000", "00.0000", "00.0000", ".0.0.00", "...4.00",
+      "0000000"]),
+    ([".......",
+      ".......",
+      ".......",
+      "XXXX...",
+      "OOO....",
+      ".......",
+      "......."], BLACK,
+     ["0000000", "0000000", "0000000", "....400", "...0000", "0000000",
+      "0000000"]),
+    (["...O...",
+      "..X....",
+      ".XO....",
+      ".X.O...",
+      ".X..O..",
+      ".......",
+      "......."], BLACK,
+     ["000.000", "02.0000", "0..0000", "0.0.000", "0.00.00", "0200010",
+      "0000000"]),
+    (["X......",
+      ".......",
+      "..XX.X.",
+      ".......",
+      ".OO.O..",
+      ".......",
+      "......O"], WHITE,
+     [".000000", "0000000", "01..1.1", "0000000", "0..2.00", "0000000",
+      "000000."]),
+    (["O......",
+      ".XX.X..",
+      ".......",
+      "...O...",
+      "..O....",
+      ".O.....",
+      "......."], WHITE,
+     [".000000", "1..1.10", "0000200", "000.000", "00.0000", "0.00000",
+      "0000000"]),
+]
+
+"""Utility"""
+def line_codes(goboard):
+    codes = []
+    for shift in [1, goboard.NS, goboard.NS + 1, goboard.NS - 1]:
+        for point in range(goboard.maxpoint):
+            code = 0
+            for k in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+                p = point + k * shift
+                color = goboard.board[p] if 0 <= p < goboard.maxpoint \
+                        else BORDER
+                code += int(color) << (2 * (k + WINDOW_RADIUS))
+            codes.append(code)
+    return codes
+
+def zobrist_code(goboard):
+    code = 0
+    for point in range(goboard.maxpoint):
+        color = goboard.board[point]
+        if color == BLACK or color == WHITE:
+            code ^= goboard.zobrist[point][color]
+    return code
+
+def board_from_rows(rows, toplay):
+    goboard = SimpleGoBoard(len(rows))
+    for row, line in enumerate(rows):
+        for col, c in enumerate(line):
+            if c != '.':
+                goboard.play_move_gomoku(goboard.pt(row + 1, col + 1),
+                                         BLACK if c == 'X' else WHITE)
+    goboard.current_player = toplay
+    return goboard
+
+def interpreted_check_pattern(goboard, pattern, start_point, color, shift,
+                              start_index):
+    """ check_pattern as it was before the policy tables """
+    opponent = WHITE + BLACK - color
+    for i, c in enumerate(pattern):
+        if i == start_index:
+            continue
+        p = start_point + (i - start_index) * shift
+        if not 0 <= p < goboard.maxpoint:
+            return False
+        b = goboard.board[p]
+        if not (c == 'x' and b == opponent or c == 'o' and b == color or
+                c == '-' and b == EMPTY or
+                c == '?' and (b == color or b == BORDER)):
+            return False
+    return True
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()